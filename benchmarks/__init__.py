@@ -0,0 +1,7 @@
+"""Нагрузочные тесты и бенчмарки платформы.
+
+Запускаются отдельно от тестов, например:
+python -m benchmarks.views --posts 2000 --output results.json
+python -m benchmarks.api_vs_html --requests 500 --concurrency 8
+python -m benchmarks.asgi_vs_wsgi --requests 200 --concurrency 50
+"""
@@ -0,0 +1,157 @@
+"""Пропускная способность JSON API контента в сравнении с HTML-страницами.
+
+Один и тот же набор данных запрашивается через /api/v1/ (JWT) и через
+HTML-страницы (сессия) на одном рабочем процессе gunicorn, результат
+приводится в запросах в секунду на процесс.
+
+python -m benchmarks.api_vs_html --posts 2000 --requests 500 --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from .common import (
+    SERVERS,
+    free_port,
+    git_revision,
+    latency_summary,
+    setup_django,
+    wait_for_port,
+)
+
+# Страница -> (имя маршрута HTML, имя маршрута API, id объекта для пути)
+PAIRS = {
+    "free_list": ("notes:free_content_list", "api_v1:free_content_list", None),
+    "free_detail": (
+        "notes:free_content_retrieve",
+        "api_v1:free_content_retrieve",
+        "free_id",
+    ),
+    "paid_list": ("notes:paid_content_list", "api_v1:paid_content_list", None),
+    "paid_detail": (
+        "notes:paid_content_retrieve",
+        "api_v1:paid_content_retrieve",
+        "paid_id",
+    ),
+}
+
+
+def drive(base_url, url, headers, cookies, count, concurrency):
+    with httpx.Client(
+        base_url=base_url,
+        headers=headers,
+        cookies=cookies,
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=60,
+    ) as client:
+        client.get(url)
+
+        def fetch(_):
+            started = time.perf_counter()
+            response = client.get(url)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - started
+    return {
+        "url": url,
+        "requests": count,
+        "errors": sum(1 for _, status in samples if status != 200),
+        "throughput_rps": round(count / elapsed, 2),
+        **latency_summary([latency for latency, _ in samples]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--subscriptions", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4, help="Потоки gunicorn")
+    parser.add_argument("--output", help="Файл для результатов в формате JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    setup_django(os.path.join(workdir, "db.sqlite3"))
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import Client
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from .seed import seed_dataset
+
+    call_command("migrate", verbosity=0)
+    ids = seed_dataset(args.users, args.posts, args.payments, args.subscriptions)
+    buyer = get_user_model().objects.get(pk=ids["buyer_id"])
+    client = Client()
+    client.force_login(buyer)
+    cookies = {"sessionid": client.cookies["sessionid"].value}
+    headers = {"Authorization": f"Bearer {RefreshToken.for_user(buyer).access_token}"}
+
+    port = free_port()
+    server = subprocess.Popen(
+        SERVERS["wsgi"](port, 1, args.threads),
+        env=dict(os.environ, PYTHONPATH=os.getcwd()),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        wait_for_port(port)
+        for name, (html_route, api_route, pk_key) in PAIRS.items():
+            route_args = [ids[pk_key]] if pk_key else []
+            html = drive(
+                base_url,
+                reverse(html_route, args=route_args),
+                {},
+                cookies,
+                args.requests,
+                args.concurrency,
+            )
+            api = drive(
+                base_url,
+                reverse(api_route, args=route_args),
+                headers,
+                {},
+                args.requests,
+                args.concurrency,
+            )
+            results[name] = {
+                "html": html,
+                "api": api,
+                "speedup": round(api["throughput_rps"] / html["throughput_rps"], 2),
+            }
+            print(name, json.dumps(results[name], ensure_ascii=False))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"revision": git_revision(), "params": vars(args), "results": results},
+                file,
+                indent=2,
+                ensure_ascii=False,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
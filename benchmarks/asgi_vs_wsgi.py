@@ -0,0 +1,157 @@
+"""Сравнение пропускной способности покупки контента под WSGI и ASGI.
+
+Stripe заменяется локальным сервером с искусственной задержкой. Под WSGI
+(gunicorn, синхронные потоки) сессия оплаты создается в потоке запроса,
+под ASGI (uvicorn) - неблокирующим клиентом Stripe (STRIPE_ASYNC_CHECKOUT).
+
+python -m benchmarks.asgi_vs_wsgi --requests 200 --concurrency 100 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from users.fake_stripe import start_fake_stripe
+
+from .common import SERVERS, free_port, setup_django, wait_for_port
+
+
+def prepare_database(content_count):
+    """Создает схему, покупателя и платный контент, возвращает cookie сессии"""
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import Client
+
+    from notes.models import PaidContent
+
+    call_command("migrate", verbosity=0)
+    User = get_user_model()
+    author = User.objects.create_user(username="author", password="pass")
+    buyer = User.objects.create_user(
+        username="buyer", password="pass", phone_number="70000000000"
+    )
+    PaidContent.objects.bulk_create(
+        PaidContent(user=author, title=f"Post {i}", price=100)
+        for i in range(content_count)
+    )
+    client = Client()
+    client.force_login(buyer)
+    return client.cookies["sessionid"].value
+
+
+def reset_payments():
+    from notes.models import ContentPayment
+    from users.models import StripeCatalogEntry
+
+    ContentPayment.objects.all().delete()
+    StripeCatalogEntry.objects.all().delete()
+
+
+async def drive(base_url, session_id, content_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        cookies={"sessionid": session_id},
+        timeout=120,
+        limits=limits,
+    ) as client:
+
+        async def buy(pk):
+            nonlocal errors
+            async with semaphore:
+                started = time.monotonic()
+                response = await client.get(f"/notes/content/paid/{pk}/buy/")
+                latencies.append(time.monotonic() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(buy(pk) for pk in content_ids))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(content_ids),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(content_ids) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def run_mode(mode, args, env, session_id, content_ids):
+    reset_payments()
+    port = free_port()
+    command = SERVERS[mode](port, args.workers, args.threads)
+    mode_env = dict(env)
+    if mode == "asgi":
+        mode_env["STRIPE_ASYNC_CHECKOUT"] = "1"
+    else:
+        mode_env["CELERY_TASK_ALWAYS_EAGER"] = "1"
+    server = subprocess.Popen(
+        command, env=mode_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        return asyncio.run(
+            drive(f"http://127.0.0.1:{port}", session_id, content_ids, args.concurrency)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="Задержка Stripe, с")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4, help="Потоки gunicorn")
+    parser.add_argument("--output", help="Файл для результатов в формате JSON")
+    args = parser.parse_args()
+
+    fake_stripe = start_fake_stripe(latency=args.latency)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    db_path = os.path.join(workdir, "db.sqlite3")
+    setup_django(db_path)
+    session_id = prepare_database(args.requests)
+
+    from notes.models import PaidContent
+
+    content_ids = list(PaidContent.objects.values_list("id", flat=True))
+    env = dict(
+        os.environ,
+        STRIPE_API_BASE=fake_stripe.base_url,
+        STRIPE_MAX_NETWORK_RETRIES="0",
+        PYTHONPATH=os.getcwd(),
+    )
+
+    results = {}
+    for mode in ("wsgi", "asgi"):
+        results[mode] = run_mode(mode, args, env, session_id, content_ids)
+        print(mode, json.dumps(results[mode], ensure_ascii=False))
+    fake_stripe.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"params": vars(args), "results": results}, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
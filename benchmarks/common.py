@@ -0,0 +1,91 @@
+"""Общие функции бенчмарков: запуск Django и серверов, расчет перцентилей"""
+
+import os
+import socket
+import subprocess
+import time
+
+SERVERS = {
+    "wsgi": lambda port, workers, threads: [
+        "gunicorn",
+        "config.wsgi:application",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(workers),
+        "--threads",
+        str(threads),
+    ],
+    "asgi": lambda port, workers, threads: [
+        "uvicorn",
+        "config.asgi:application",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--no-access-log",
+    ],
+}
+
+
+def setup_django(db_path):
+    os.environ["BENCHMARK_DB"] = db_path
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    import django
+
+    django.setup()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Сервер на порту {port} не запустился")
+
+
+def percentile(sorted_values, percent):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка"""
+
+    if not sorted_values:
+        return 0
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(latencies):
+    """p50/p95/p99 и максимум в миллисекундах"""
+
+    values = sorted(latencies)
+    return {
+        f"{name}_ms": round(value * 1000, 2)
+        for name, value in (
+            ("p50", percentile(values, 50)),
+            ("p95", percentile(values, 95)),
+            ("p99", percentile(values, 99)),
+            ("max", values[-1] if values else 0),
+        )
+    }
+
+
+def git_revision():
+    """Текущий коммит, чтобы результаты можно было сравнивать между версиями"""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
@@ -0,0 +1,131 @@
+"""Параметризованный набор данных для бенчмарков"""
+
+import random
+
+PASSWORD = "pass"
+WORDS = (
+    "платформа контент подписка автор запись оплата читатель статья видео "
+    "материал курс урок доступ сервис публикация новость обзор"
+).split()
+
+
+def make_body(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed_dataset(users, posts, payments, subscriptions, body_words=300, seed=0):
+    """Заполняет пустую базу пользователями, записями, оплатами и подписками.
+
+    Половина записей бесплатные, половина платные. Возвращает словарь
+    с id пользователей и записей, нужных для построения адресов.
+    """
+
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    from notes.models import (
+        BuyerSubscription,
+        ContentPayment,
+        FreeContent,
+        PaidContent,
+        build_excerpt,
+    )
+    from users.models import Payment
+
+    rng = random.Random(seed)
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(
+            username=f"user{i}",
+            password=password,
+            phone_number=f"7{i:010d}",
+            subscription=i % 2 == 0,
+        )
+        for i in range(users)
+    )
+    User.objects.create_user(username="staff", password=PASSWORD, is_staff=True)
+    user_ids = list(
+        User.objects.filter(username__startswith="user")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+    def content_kwargs():
+        body = make_body(rng, body_words)
+        return {
+            "user_id": rng.choice(user_ids),
+            "title": make_body(rng, 5)[:150],
+            "body": body,
+            "excerpt": build_excerpt(body),
+        }
+
+    FreeContent.objects.bulk_create(
+        (FreeContent(**content_kwargs()) for _ in range(posts // 2)),
+        batch_size=500,
+    )
+    PaidContent.objects.bulk_create(
+        (
+            PaidContent(price=rng.randint(1, 50) * 10, **content_kwargs())
+            for _ in range(posts - posts // 2)
+        ),
+        batch_size=500,
+    )
+    paid_ids = list(PaidContent.objects.order_by("pk").values_list("pk", flat=True))
+
+    ContentPayment.objects.bulk_create(
+        (
+            ContentPayment(
+                user_id=rng.choice(user_ids),
+                paid_content_id=rng.choice(paid_ids),
+                payment_amount=1000,
+                session_id=f"cs_seed_{i}",
+                status=rng.choice(("paid", "unpaid", "expired")),
+            )
+            for i in range(payments)
+        ),
+        batch_size=500,
+    )
+    Payment.objects.bulk_create(
+        (
+            Payment(user_id=user_id, payment_amount=10000, status="paid")
+            for user_id in user_ids[::2]
+        ),
+        batch_size=500,
+    )
+    pairs = {
+        (rng.choice(user_ids), rng.choice(paid_ids))
+        for _ in range(min(subscriptions, len(user_ids) * len(paid_ids)))
+    }
+    BuyerSubscription.objects.bulk_create(
+        (
+            BuyerSubscription(user_id=user_id, content_id=content_id)
+            for user_id, content_id in pairs
+        ),
+        batch_size=500,
+    )
+
+    # Первый пользователь - покупатель с подписками, автор берется по записи
+    buyer_id = user_ids[0]
+    subscribed = BuyerSubscription.objects.filter(user_id=buyer_id).first()
+    paid = PaidContent.objects.get(
+        pk=subscribed.content_id if subscribed else paid_ids[0]
+    )
+    if not subscribed:
+        BuyerSubscription.objects.create(user_id=buyer_id, content=paid)
+    free = FreeContent.objects.order_by("pk").first()
+    unpurchased = (
+        PaidContent.objects.exclude(user_id=buyer_id)
+        .exclude(buyersubscription__user_id=buyer_id)
+        .order_by("pk")
+        .first()
+    )
+    return {
+        "buyer_id": buyer_id,
+        "free_author_id": free.user_id,
+        "paid_author_id": paid.user_id,
+        "staff_id": User.objects.get(username="staff").pk,
+        "free_id": free.pk,
+        "paid_id": paid.pk,
+        "unpurchased_id": unpurchased.pk,
+    }
@@ -0,0 +1,40 @@
+"""Настройки для бенчмарков: SQLite-база во временном файле и локальный кеш,
+чтобы запуск не требовал PostgreSQL и Redis."""
+
+import os
+
+os.environ.setdefault("POSTGRES_ENGINE", "django.db.backends.sqlite3")
+os.environ.setdefault("POSTGRES_DB", "")
+os.environ.setdefault("POSTGRES_USER", "")
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+os.environ.setdefault("POSTGRES_HOST", "")
+os.environ.setdefault("POSTGRES_PORT", "")
+os.environ.setdefault("STRIPE_API_KEY", "sk_test_benchmark")
+os.environ.setdefault("SERVICE_SUBSCRIPTION_PRICE", "100")
+
+from config.settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+# Запросы считает сам бенчмарк, middleware только добавил бы накладные расходы
+QUERY_COUNT_ENABLED = False
+# Без collectstatic: ссылки на статику строятся без манифеста
+STORAGES = {
+    **STORAGES,  # noqa: F405
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCHMARK_DB", "/tmp/benchmark.sqlite3"),
+        "OPTIONS": {"timeout": 30},
+    }
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
@@ -0,0 +1,279 @@
+"""Сквозной бенчмарк страниц приложений notes и users.
+
+Заполняет временную базу набором данных заданного размера и запрашивает
+каждый адрес из notes/urls.py и users/urls.py сначала через тестовый клиент
+Django (задержка, число SQL-запросов и память на запрос), затем через
+настоящий HTTP-сервер (задержка и пропускная способность).
+
+python -m benchmarks.views --posts 2000 --requests 50 --output results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import httpx
+
+from .common import (
+    SERVERS,
+    free_port,
+    git_revision,
+    latency_summary,
+    setup_django,
+    wait_for_port,
+)
+
+# Имя маршрута -> (пользователь, id объекта для пути, строка запроса).
+# Пользователь и объект - ключи словаря, который возвращает seed_dataset
+SCENARIOS = {
+    "notes:free_content_list": (None, None, ""),
+    "notes:free_content_search": (None, None, "?q=подписка"),
+    "notes:free_content_retrieve": (None, "free_id", ""),
+    "notes:free_content_create": ("free_author_id", None, ""),
+    "notes:free_content_update": ("free_author_id", "free_id", ""),
+    "notes:free_content_destroy": ("free_author_id", "free_id", ""),
+    "notes:paid_content_list": ("buyer_id", None, ""),
+    "notes:paid_content_search": ("buyer_id", None, "?q=подписка"),
+    "notes:paid_content_retrieve": ("buyer_id", "paid_id", ""),
+    "notes:paid_content_create": ("paid_author_id", None, ""),
+    "notes:paid_content_update": ("paid_author_id", "paid_id", ""),
+    "notes:paid_content_destroy": ("paid_author_id", "paid_id", ""),
+    "notes:buy_paid_content": ("buyer_id", "unpurchased_id", ""),
+    "notes:paid_content_attachment_create": ("paid_author_id", "paid_id", ""),
+    "notes:my_content": ("free_author_id", None, ""),
+    "notes:contacts": (None, None, ""),
+    "users:register": (None, None, ""),
+    "users:login": (None, None, ""),
+    "users:user_profile": ("buyer_id", None, ""),
+    "users:service_subscribe": ("buyer_id", None, ""),
+    "users:stripe_metrics": ("staff_id", None, ""),
+}
+# Маршруты, которые принимают только POST и не измеряются
+SKIPPED = {
+    "users:token": "POST API получения JWT",
+    "users:logout": "выход доступен только через POST",
+    "users:stripe_webhook": "принимает только подписанные события Stripe",
+    "notes:paid_content_attachment_download": "файл отдает nginx (X-Accel-Redirect)",
+}
+
+
+def route_names():
+    from django.urls import get_resolver
+
+    names = set()
+    for namespace in ("notes", "users"):
+        resolver = get_resolver().namespace_dict[namespace][1]
+        names |= {
+            f"{namespace}:{name}"
+            for name in resolver.reverse_dict.keys()
+            if isinstance(name, str)
+        }
+    return names
+
+
+def build_requests(ids, only):
+    from django.urls import reverse
+
+    missing = route_names() - SCENARIOS.keys() - SKIPPED.keys()
+    if missing:
+        print(
+            "Нет сценария для маршрутов:", ", ".join(sorted(missing)), file=sys.stderr
+        )
+    requests = {}
+    for name, (user_key, pk_key, query) in SCENARIOS.items():
+        if only and name not in only:
+            continue
+        args = [ids[pk_key]] if pk_key else []
+        requests[name] = (ids.get(user_key), reverse(name, args=args) + query)
+    return requests
+
+
+def get_clients(requests):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    clients = {}
+    for user_id, _ in requests.values():
+        if user_id not in clients:
+            clients[user_id] = Client()
+            if user_id:
+                clients[user_id].force_login(get_user_model().objects.get(pk=user_id))
+    return clients
+
+
+def measure_client(requests, count, memory_samples):
+    """Задержка, SQL-запросы и выделенная память на запрос в тестовом клиенте"""
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    clients = get_clients(requests)
+    results = {}
+    for name, (user_id, url) in requests.items():
+        client = clients[user_id]
+        status = client.get(url).status_code
+        latencies = []
+        queries = []
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                client.get(url)
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+
+        # tracemalloc замедляет выполнение, поэтому память меряется отдельно
+        peaks = []
+        retained = []
+        tracemalloc.start()
+        for _ in range(memory_samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            client.get(url)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+        tracemalloc.stop()
+
+        results[name] = {
+            "url": url,
+            "status": status,
+            "requests": count,
+            **latency_summary(latencies),
+            "queries": max(queries),
+            "queries_min": min(queries),
+            "memory_peak_kb": round(statistics.median(peaks) / 1024, 1),
+            "memory_retained_kb": round(statistics.median(retained) / 1024, 1),
+        }
+        print(name, json.dumps(results[name], ensure_ascii=False))
+    return results
+
+
+def measure_server(mode, requests, count, concurrency, args, env):
+    """Задержка и пропускная способность через запущенный HTTP-сервер"""
+
+    clients = get_clients(requests)
+    cookies = {
+        user_id: {"sessionid": client.cookies["sessionid"].value} if user_id else {}
+        for user_id, client in clients.items()
+    }
+    port = free_port()
+    server = subprocess.Popen(
+        SERVERS[mode](port, args.workers, args.threads),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        wait_for_port(port)
+        for name, (user_id, url) in requests.items():
+            with httpx.Client(
+                base_url=f"http://127.0.0.1:{port}",
+                cookies=cookies[user_id],
+                limits=httpx.Limits(max_connections=concurrency),
+                timeout=60,
+            ) as client:
+                status = client.get(url).status_code
+
+                def fetch(_):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    return time.perf_counter() - started, response.status_code
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    samples = list(executor.map(fetch, range(count)))
+                elapsed = time.perf_counter() - started
+
+            results[name] = {
+                "url": url,
+                "status": status,
+                "requests": count,
+                "errors": sum(1 for _, code in samples if code >= 500),
+                "throughput_rps": round(count / elapsed, 2),
+                **latency_summary([latency for latency, _ in samples]),
+            }
+            print(f"{mode} {name}", json.dumps(results[name], ensure_ascii=False))
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--payments", type=int, default=5000)
+    parser.add_argument("--subscriptions", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50, help="Запросов на адрес")
+    parser.add_argument(
+        "--memory-samples",
+        type=int,
+        default=5,
+        help="Запросов на адрес для замера памяти",
+    )
+    parser.add_argument(
+        "--server",
+        choices=("wsgi", "asgi", "none"),
+        default="wsgi",
+        help="HTTP-сервер для второго прохода",
+    )
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4, help="Потоки gunicorn")
+    parser.add_argument("--only", help="Имена маршрутов через запятую")
+    parser.add_argument("--output", help="Файл для результатов в формате JSON")
+    args = parser.parse_args()
+
+    # Оплата создается без обращения к Stripe и без брокера Celery
+    os.environ.setdefault("STRIPE_FAKE_MODE", "1")
+    os.environ.setdefault("CELERY_TASK_ALWAYS_EAGER", "1")
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    setup_django(os.path.join(workdir, "db.sqlite3"))
+
+    from django.core.management import call_command
+
+    from .seed import seed_dataset
+
+    call_command("migrate", verbosity=0)
+    started = time.perf_counter()
+    ids = seed_dataset(args.users, args.posts, args.payments, args.subscriptions)
+    print(f"Данные созданы за {time.perf_counter() - started:.1f} с", file=sys.stderr)
+
+    only = set(args.only.split(",")) if args.only else None
+    requests = build_requests(ids, only)
+    results = {"client": measure_client(requests, args.requests, args.memory_samples)}
+    if args.server != "none":
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        results[args.server] = measure_server(
+            args.server, requests, args.requests, args.concurrency, args, env
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "params": vars(args),
+                    "skipped": SKIPPED,
+                    "results": results,
+                },
+                file,
+                indent=2,
+                ensure_ascii=False,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
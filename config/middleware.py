@@ -0,0 +1,122 @@
+import json
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .queries import QueryBudgetExceeded, QueryStats, get_query_budget
+from .timing import end_timings, install_db_timing, start_timings
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("config.timing")
+
+
+class ServerTimingMiddleware:
+    """Добавляет заголовок Server-Timing с временем базы, шаблонов и Stripe.
+
+    Замеряется доля запросов SERVER_TIMING_SAMPLE_RATE, для каждого из них
+    в журнал config.timing пишется строка JSON с теми же фазами.
+    Работает и в синхронном, и в асинхронном режиме.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_db_timing()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timings, token = start_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_timings(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timings, token = start_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_timings(token)
+        return self.finish(request, response, timings)
+
+    def sampled(self):
+        return random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+
+    def finish(self, request, response, timings):
+        data = timings.as_dict()
+        response["Server-Timing"] = timings.header(data)
+        match = request.resolver_match
+        timing_logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": match.view_name if match else None,
+                    "status": response.status_code,
+                    **data,
+                }
+            )
+        )
+        return response
+
+
+class QueryCountMiddleware:
+    """Считает SQL-запросы, их общее время и повторы для каждого запроса.
+
+    Результат пишется в журнал, а при DEBUG - в заголовки X-DB-* ответа.
+    Превышение бюджета представления записывается как предупреждение,
+    при QUERY_BUDGET_STRICT - завершается исключением QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryStats() as stats:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        budget = get_query_budget(match.func) if match else None
+        logger.info(
+            "%s %s: %s queries, %s ms, %s duplicates",
+            request.method,
+            request.path,
+            stats.count,
+            stats.duration_ms,
+            stats.duplicates,
+        )
+        if settings.DEBUG:
+            response["X-DB-Queries"] = stats.count
+            response["X-DB-Time-Ms"] = stats.duration_ms
+            response["X-DB-Duplicate-Queries"] = stats.duplicates
+            if budget is not None:
+                response["X-DB-Query-Budget"] = budget
+
+        if budget is not None and stats.count > budget:
+            sql, repeats = stats.most_repeated()
+            message = (
+                f"{match.view_name}: {stats.count} SQL-запросов при бюджете {budget}, "
+                f"чаще всего ({repeats} раз): {sql}"
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,96 @@
+"""Подсчет SQL-запросов и бюджет запросов для представлений.
+
+Бюджет задается атрибутом класса query_budget у представлений на классах
+или декоратором query_budget у функций. QueryCountMiddleware сравнивает с ним
+число запросов, выполненных при обработке каждого HTTP-запроса.
+Запросы задач Celery, выполненных внутри HTTP-запроса при
+CELERY_TASK_ALWAYS_EAGER, не считаются: в рабочем режиме их выполняет воркер.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from celery.signals import task_postrun, task_prerun
+from django.db import connections
+
+_tasks = threading.local()
+
+
+@task_prerun.connect
+def _task_started(**kwargs):
+    _tasks.depth = getattr(_tasks, "depth", 0) + 1
+
+
+@task_postrun.connect
+def _task_finished(**kwargs):
+    _tasks.depth -= 1
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше SQL-запросов, чем разрешено бюджетом"""
+
+
+def query_budget(limit):
+    """Декоратор, задающий бюджет SQL-запросов функции-представлению"""
+
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+
+    return decorator
+
+
+def get_query_budget(view_func):
+    """Бюджет функции-представления или класса, из которого она создана"""
+
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        budget = getattr(getattr(view_func, "view_class", None), "query_budget", None)
+    return budget
+
+
+class QueryStats:
+    """Собирает SQL-запросы всех подключений к базе внутри блока with"""
+
+    def __init__(self):
+        self.queries = []
+        self.duration = 0.0
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_tasks, "depth", 0):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries.append((sql, repr(params)))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration_ms(self):
+        return round(self.duration * 1000, 2)
+
+    @property
+    def duplicates(self):
+        """Количество повторов одного и того же запроса с теми же параметрами"""
+
+        return sum(count - 1 for count in Counter(self.queries).values())
+
+    def most_repeated(self):
+        sql, count = Counter(sql for sql, _ in self.queries).most_common(1)[0]
+        return sql, count
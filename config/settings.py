@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.ServerTimingMiddleware",
+    "config.middleware.QueryCountMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -44,7 +46,7 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "config.timing.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -73,6 +75,14 @@ DATABASES = {
 }
 
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/0"),
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -100,17 +110,96 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
-# STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+# collectstatic добавляет хеш содержимого в имена файлов и создает рядом
+# сжатые копии .gz и .br, медиафайлы получают версию в адресе (config.storage)
+STORAGES = {
+    "default": {"BACKEND": "config.storage.VersionedFileSystemStorage"},
+    "staticfiles": {"BACKEND": "config.storage.CompressedManifestStaticFilesStorage"},
+    # Файлы платных записей хранятся вне MEDIA_ROOT и отдаются только покупателям
+    "protected": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.path.join(BASE_DIR, "protected")},
+    },
+}
+# Внутренний адрес nginx для X-Accel-Redirect (location /protected/ в
+# nginx/nginx.conf). Пусто - файлы платных записей отдает сам Django
+PROTECTED_MEDIA_ACCEL_PREFIX = os.environ.get("PROTECTED_MEDIA_ACCEL_PREFIX", "")
 
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Стороны квадратных миниатюр фото профиля (users.avatars) и наибольшая
+# сторона исходного фото после удаления метаданных
+AVATAR_SIZES = (64, 150, 300)
+AVATAR_MAX_SIZE = 1024
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.CustomUser"
 
 LOGIN_REDIRECT_URL = "users:user_profile"
 
+CONTENT_PAGE_SIZE = int(os.environ.get("CONTENT_PAGE_SIZE", 20))
+
+CONTENT_SEARCH_CONFIG = os.environ.get("CONTENT_SEARCH_CONFIG", "russian")
+
+ENTITLEMENT_CACHE_TIMEOUT = 60 * 60
+ROLE_CACHE_TIMEOUT = 60 * 60
+# Время хранения страниц бесплатного контента для анонимных посетителей
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", 60 * 5))
+
+# Подсчет SQL-запросов на каждый запрос (config.middleware.QueryCountMiddleware).
+# Под ASGI синхронный middleware переводит обработку в поток, поэтому
+# он включается только явно: в тестах и при разработке (.env.example)
+QUERY_COUNT_ENABLED = os.environ.get("QUERY_COUNT_ENABLED", "0") == "1"
+# Превышение бюджета запросов представления вызывает ошибку, а не предупреждение
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT") == "1"
+
+# Доля запросов с заголовком Server-Timing и записью фаз в журнал config.timing,
+# 0 отключает замеры
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get("SERVER_TIMING_SAMPLE_RATE", 0.05))
+
+# Строки с числом SQL-запросов и фазами Server-Timing пишутся логгерами config.*
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "config": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "INFO"),
+        },
+    },
+}
+
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", CACHES["default"]["LOCATION"])
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("CELERY_TASK_ALWAYS_EAGER") == "1"
+
+# Режим без обращения к Stripe: цены и сессии оплаты создаются локально
+STRIPE_FAKE_MODE = os.environ.get("STRIPE_FAKE_MODE") == "1"
+
+STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
+
+STRIPE_API_KEY = os.environ["STRIPE_API_KEY"]
+# Цена подписки на сервис в рублях (users.services.service_subscription_amount)
+SERVICE_SUBSCRIPTION_PRICE = (
+    int(os.environ["SERVICE_SUBSCRIPTION_PRICE"])
+    if os.environ.get("SERVICE_SUBSCRIPTION_PRICE")
+    else None
+)
+STRIPE_TIMEOUT = int(os.environ.get("STRIPE_TIMEOUT", 10))
+STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get("STRIPE_MAX_NETWORK_RETRIES", 2))
+STRIPE_POOL_SIZE = 10
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = 5
+STRIPE_CIRCUIT_RESET_TIMEOUT = 30
+# Адрес API Stripe, например локального сервера из manage.py run_fake_stripe
+STRIPE_API_BASE = os.environ.get("STRIPE_API_BASE", "")
+# Создавать сессию оплаты прямо в асинхронном представлении вместо очереди
+# Celery. Включается только при запуске под ASGI (config.asgi)
+STRIPE_ASYNC_CHECKOUT = os.environ.get("STRIPE_ASYNC_CHECKOUT") == "1"
+
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -139,3 +228,19 @@ if "test" in sys.argv:
             "NAME": BASE_DIR / "test_db_sqlite3",
         }
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    # Манифест статики создает только collectstatic
+    STORAGES["staticfiles"] = {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    }
+    CELERY_TASK_ALWAYS_EAGER = True
+    STRIPE_FAKE_MODE = True
+    SERVICE_SUBSCRIPTION_PRICE = 100
+    QUERY_COUNT_ENABLED = True
+    QUERY_BUDGET_STRICT = True
+    SERVER_TIMING_SAMPLE_RATE = 1
+    LOGGING["loggers"]["config"]["level"] = "WARNING"
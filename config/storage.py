@@ -0,0 +1,111 @@
+"""Хранилища файлов: статика с хешем в имени и предварительным сжатием,
+медиафайлы с версией в адресе.
+
+Имена статических файлов содержат хеш содержимого, а ссылки на медиафайлы -
+время их изменения, поэтому и те и другие можно отдавать с заголовком
+Cache-Control: immutable (nginx/nginx.conf).
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, storages
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения текстовых файлов, которые имеет смысл сжимать заранее
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".map", ".svg", ".json", ".txt", ".html")
+# Файлы меньше этого размера nginx отдает без сжатия
+COMPRESS_MIN_SIZE = 256
+
+
+def compress(data, precompress_brotli=True):
+    """Сжатые варианты файла: расширение -> содержимое"""
+
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if precompress_brotli:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и готовыми файлами .gz и .br.
+
+    Сжатые копии создаются при collectstatic рядом с файлами, имена которых
+    содержат хеш, и отдаются nginx через gzip_static и brotli_static.
+    Без пакета Brotli collectstatic завершается ошибкой, чтобы сборка не
+    осталась молча без файлов .br; отключить их можно параметром
+    precompress_brotli в OPTIONS хранилища.
+    """
+
+    def __init__(self, *args, precompress_brotli=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompress_brotli = precompress_brotli
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # Сторонние библиотеки ссылаются на карты исходников (.map),
+            # которые не поставляются вместе с ними
+            if name.strip().endswith(".map"):
+                return name
+            raise
+
+    def post_process(self, paths, dry_run=False, **options):
+        if self.precompress_brotli and brotli is None:
+            raise ImproperlyConfigured(
+                "Для сжатия статики в .br нужен пакет Brotli (requirements.txt), "
+                "либо precompress_brotli=False в OPTIONS хранилища статики"
+            )
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.write_compressed(hashed_name)
+
+    def write_compressed(self, name):
+        path = self.path(name)
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for extension, compressed in compress(data, self.precompress_brotli).items():
+            # Сжатие, не уменьшившее файл, бесполезно
+            if len(compressed) < len(data):
+                with open(path + extension, "wb") as file:
+                    file.write(compressed)
+
+
+class VersionedFileSystemStorage(FileSystemStorage):
+    """Хранилище медиафайлов, добавляющее в адрес время изменения файла.
+
+    Файлы, перезаписанные под тем же именем (например, миниатюры фото
+    профиля), получают новый адрес, и браузер не показывает старую копию.
+    """
+
+    def url(self, name):
+        url = super().url(name)
+        try:
+            version = int(os.path.getmtime(self.path(name)))
+        except (OSError, ValueError):
+            return url
+        return f"{url}?v={version:x}"
+
+
+def protected_storage():
+    """Хранилище файлов платных записей (STORAGES["protected"])"""
+
+    return storages["protected"]
@@ -0,0 +1,117 @@
+"""Замер времени фаз обработки запроса для заголовка Server-Timing.
+
+Время базы данных, шаблонов и вызовов Stripe накапливается в объекте
+RequestTimings текущего запроса. Он хранится в ContextVar, поэтому замеры
+работают и в потоках sync_to_async. Вне выбранного запроса хуки ничего не делают.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+# Фаза -> описание для заголовка Server-Timing
+PHASES = {
+    "db": "Database",
+    "tpl": "Templates",
+    "stripe": "Stripe API",
+}
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Суммарное время и количество операций каждой фазы одного запроса"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, phase, seconds):
+        self.durations[phase] += seconds
+        self.counts[phase] += 1
+
+    def as_dict(self):
+        total = time.perf_counter() - self.started
+        data = {
+            phase: {
+                "ms": round(self.durations[phase] * 1000, 2),
+                "count": self.counts[phase],
+            }
+            for phase in PHASES
+        }
+        data["total"] = {"ms": round(total * 1000, 2)}
+        return data
+
+    def header(self, data):
+        metrics = [
+            f'{phase};dur={data[phase]["ms"]};desc="{desc} x{data[phase]["count"]}"'
+            for phase, desc in PHASES.items()
+        ]
+        metrics.append(f'total;dur={data["total"]["ms"]}')
+        return ", ".join(metrics)
+
+
+def start_timings():
+    """Начинает замер запроса, возвращает (замеры, токен для end_timings)"""
+
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_timings(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Добавляет время блока к фазе текущего запроса, если он замеряется"""
+
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def db_timing_wrapper(execute, sql, params, many, context):
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+def add_db_timing(connection, **kwargs):
+    if db_timing_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_timing_wrapper)
+
+
+def install_db_timing():
+    """Подключает замер запросов ко всем открытым и новым подключениям"""
+
+    connection_created.connect(add_db_timing, dispatch_uid="config.timing")
+    for connection in connections.all(initialized_only=True):
+        add_db_timing(connection)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("tpl"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время отрисовки шаблонов"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -31,6 +31,7 @@ urlpatterns = [
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
     path("notes/", include("notes.urls", namespace="notes")),
     path("users/", include("users.urls", namespace="users")),
+    path("api/v1/", include("notes.api_urls", namespace="api_v1")),
 ]
 
 if settings.DEBUG:
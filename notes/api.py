@@ -0,0 +1,143 @@
+import hashlib
+from functools import cached_property
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.text import Truncator
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .entitlements import get_entitled_content_ids
+from .models import FreeContent, PaidContent
+from .serializers import FreeContentSerializer, PaidContentSerializer
+
+CONTENT_FIELDS = ("id", "title", "excerpt", "video_link", "created_at", "updated_at")
+# Длина краткого содержания платной записи без доступа, как в HTML-списке
+PAID_PREVIEW_LENGTH = 30
+
+
+class ContentCursorPagination(CursorPagination):
+    """Постраничный вывод по курсору, стоимость не зависит от глубины страницы"""
+
+    ordering = "-id"
+    page_size = settings.CONTENT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class ContentAPIMixin:
+    """Mixin представлений API контента только для чтения.
+
+    Записи выбираются через values() и отдаются словарями без создания
+    объектов моделей; serializer_class нужен только для документации API.
+    """
+
+    model = None
+    fields = CONTENT_FIELDS
+    extra_fields = ()
+    renderer_classes = [JSONRenderer]
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        return self.model.objects.values(
+            *self.fields, *self.extra_fields, "user_id", author=F("user__username")
+        )
+
+    def serialize(self, row):
+        row.pop("user_id")
+        return row
+
+
+class ContentListAPIMixin(ContentAPIMixin):
+    pagination_class = ContentCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response([self.serialize(row) for row in page])
+
+
+class ContentDetailAPIMixin(ContentAPIMixin):
+    """Mixin записи с текстом, отвечает 304 по ETag и Last-Modified"""
+
+    fields = CONTENT_FIELDS + ("body",)
+
+    def retrieve(self, request, *args, **kwargs):
+        row = self.get_queryset().filter(pk=kwargs["pk"]).first()
+        if row is None:
+            raise NotFound("Запись не найдена")
+        data = self.serialize(row)
+        raw = (
+            f"{self.model._meta.label_lower}:{data['id']}:"
+            f"{data['updated_at'].isoformat()}:{request.user.pk}:"
+            f"{data.get('has_access')}"
+        )
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        last_modified = int(data["updated_at"].timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        ) or Response(data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+
+class PaidContentAPIMixin:
+    """Доступ к тексту платной записи есть у автора и у купивших ее"""
+
+    model = PaidContent
+    serializer_class = PaidContentSerializer
+    extra_fields = ("price",)
+
+    @cached_property
+    def entitled_ids(self):
+        return get_entitled_content_ids(self.request.user)
+
+    def serialize(self, row):
+        user = self.request.user
+        row["has_access"] = user.is_authenticated and (
+            row["user_id"] == user.pk or row["id"] in self.entitled_ids
+        )
+        if not row["has_access"]:
+            # Материалы записи скрыты так же, как на HTML-странице
+            row["video_link"] = None
+            row["excerpt"] = Truncator(row["excerpt"]).chars(PAID_PREVIEW_LENGTH)
+            if "body" in row:
+                row["body"] = None
+        return super().serialize(row)
+
+
+class FreeContentListAPIView(ContentListAPIMixin, ListAPIView):
+    """API списка бесплатного контента"""
+
+    model = FreeContent
+    serializer_class = FreeContentSerializer
+    query_budget = 2
+
+
+class FreeContentDetailAPIView(ContentDetailAPIMixin, RetrieveAPIView):
+    """API записи бесплатного контента"""
+
+    model = FreeContent
+    serializer_class = FreeContentSerializer
+    query_budget = 2
+
+
+class PaidContentListAPIView(PaidContentAPIMixin, ContentListAPIMixin, ListAPIView):
+    """API списка платного контента с признаком доступа пользователя"""
+
+    query_budget = 3
+
+
+class PaidContentDetailAPIView(
+    PaidContentAPIMixin, ContentDetailAPIMixin, RetrieveAPIView
+):
+    """API записи платного контента, текст отдается только при наличии доступа"""
+
+    query_budget = 3
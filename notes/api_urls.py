@@ -0,0 +1,25 @@
+from django.urls import path
+
+from .api import (
+    FreeContentDetailAPIView,
+    FreeContentListAPIView,
+    PaidContentDetailAPIView,
+    PaidContentListAPIView,
+)
+
+app_name = "api_v1"
+
+urlpatterns = [
+    path("content/free/", FreeContentListAPIView.as_view(), name="free_content_list"),
+    path(
+        "content/free/<int:pk>/",
+        FreeContentDetailAPIView.as_view(),
+        name="free_content_retrieve",
+    ),
+    path("content/paid/", PaidContentListAPIView.as_view(), name="paid_content_list"),
+    path(
+        "content/paid/<int:pk>/",
+        PaidContentDetailAPIView.as_view(),
+        name="paid_content_retrieve",
+    ),
+]
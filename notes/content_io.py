@@ -0,0 +1,43 @@
+"""Формат файлов импорта и экспорта контента (JSONL и CSV)"""
+
+import csv
+import json
+
+from .models import FreeContent, PaidContent
+
+FIELDS = ("type", "id", "author", "title", "body", "video_link", "price", "created_at")
+CONTENT_TYPES = {"free": FreeContent, "paid": PaidContent}
+FORMATS = ("jsonl", "csv")
+
+
+def detect_format(path, format=None):
+    if format:
+        return format
+    return "csv" if str(path).lower().endswith(".csv") else "jsonl"
+
+
+class JSONLWriter:
+    def __init__(self, file):
+        self.file = file
+
+    def writeheader(self):
+        pass
+
+    def writerow(self, row):
+        self.file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+
+def get_writer(file, format):
+    if format == "csv":
+        return csv.DictWriter(file, fieldnames=FIELDS)
+    return JSONLWriter(file)
+
+
+def read_rows(file, format):
+    """Построчно читает записи файла, возвращает пары (номер записи, словарь)"""
+
+    if format == "csv":
+        rows = csv.DictReader(file)
+    else:
+        rows = (json.loads(line) for line in file if line.strip())
+    return enumerate(rows, start=1)
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import BuyerSubscription, PaidContent
+
+
+def entitlement_cache_key(user_id):
+    return f"entitlements:{user_id}"
+
+
+def get_entitled_content_ids(user):
+    """Возвращает множество id платного контента, доступного пользователю.
+
+    В множество входят собственные записи пользователя и записи с активной
+    подпиской. Результат хранится в кеше до изменения подписок или владельцев.
+    """
+
+    if not user.is_authenticated:
+        return frozenset()
+    key = entitlement_cache_key(user.pk)
+    content_ids = cache.get(key)
+    if content_ids is None:
+        owned = PaidContent.objects.filter(user=user).values_list("id", flat=True)
+        subscribed = BuyerSubscription.objects.filter(
+            user=user, is_active=True
+        ).values_list("content_id", flat=True)
+        content_ids = frozenset(owned.union(subscribed))
+        cache.set(key, content_ids, settings.ENTITLEMENT_CACHE_TIMEOUT)
+    return content_ids
+
+
+def has_content_access(user, content):
+    """Проверяет, может ли пользователь просматривать платный контент"""
+
+    if not user.is_authenticated:
+        return False
+    if content.user_id == user.pk:
+        return True
+    return content.pk in get_entitled_content_ids(user)
+
+
+def invalidate_entitlements(*user_ids):
+    keys = [entitlement_cache_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        cache.delete_many(keys)
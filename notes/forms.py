@@ -1,5 +1,5 @@
 from django import forms
-from .models import FreeContent, PaidContent
+from .models import FreeContent, PaidContent, PaidContentAttachment
 
 
 class FreeContentForm(forms.ModelForm):
@@ -44,3 +44,19 @@ class PaidContentForm(forms.ModelForm):
         self.fields["price"].widget.attrs.update(
             {"class": "form-control", "placeholder": "Введите цену доступа к контенту"}
         )
+
+
+class PaidContentAttachmentForm(forms.ModelForm):
+    """Форма для загрузки файла к объекту модели PaidContent"""
+
+    class Meta:
+        model = PaidContentAttachment
+        fields = ["title", "file"]
+
+    def __init__(self, *args, **kwargs):
+
+        super(PaidContentAttachmentForm, self).__init__(*args, **kwargs)
+
+        self.fields["title"].widget.attrs.update(
+            {"class": "form-control", "placeholder": "Введите название файла"}
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import FreeContent, PaidContent, build_excerpt
+from notes.page_cache import invalidate_free_content_pages
+
+
+class Command(BaseCommand):
+    """Команда заполняет краткое содержание у существующих записей"""
+
+    help = "Заполняет поле excerpt у бесплатного и платного контента"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество записей, обновляемых за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for model in (FreeContent, PaidContent):
+            updated = self.backfill(model, batch_size)
+            self.stdout.write(
+                self.style.SUCCESS(f"{model.__name__}: обновлено записей - {updated}")
+            )
+        # bulk_update не отправляет сигналы, страницы сбрасываются вручную
+        invalidate_free_content_pages()
+
+    def backfill(self, model, batch_size):
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("id", "body", "excerpt")[:batch_size]
+            )
+            if not batch:
+                return updated
+            changed = []
+            for content in batch:
+                excerpt = build_excerpt(content.body)
+                if content.excerpt != excerpt:
+                    content.excerpt = excerpt
+                    changed.append(content)
+            model.objects.bulk_update(changed, ["excerpt"])
+            updated += len(changed)
+            last_pk = batch[-1].pk
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from notes.content_io import (
+    CONTENT_TYPES,
+    FORMATS,
+    detect_format,
+    get_writer,
+    read_rows,
+)
+from notes.models import PaidContent
+
+
+class Command(BaseCommand):
+    """Команда выгружает контент в файл JSONL или CSV.
+
+    Записи читаются по возрастанию id через iterator(), поэтому память
+    не зависит от объема выгрузки. С --resume выгрузка дописывается в
+    существующий файл, начиная с записи после последней выгруженной.
+    """
+
+    help = "Выгружает бесплатный и платный контент в JSONL или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Путь к файлу или - для stdout")
+        parser.add_argument("--type", choices=(*CONTENT_TYPES, "all"), default="all")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Количество записей, читаемых из базы за один запрос",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Дописать файл, пропустив уже выгруженные записи",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        format = detect_format(output, options["format"])
+        types = CONTENT_TYPES if options["type"] == "all" else [options["type"]]
+        last_ids = {}
+        if options["resume"] and output != "-" and os.path.exists(output):
+            last_ids = self.read_last_ids(output, format)
+
+        if output == "-":
+            file = sys.stdout
+        else:
+            mode = "a" if last_ids else "w"
+            file = open(output, mode, newline="", encoding="utf-8")
+        try:
+            writer = get_writer(file, format)
+            if not last_ids:
+                writer.writeheader()
+            started = time.monotonic()
+            total = 0
+            for content_type in types:
+                total += self.export(
+                    content_type, writer, last_ids.get(content_type, 0), options
+                )
+            elapsed = max(time.monotonic() - started, 0.001)
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Выгружено записей: {total} за {elapsed:.1f} с "
+                f"({total / elapsed:.0f} записей/с)"
+            )
+        )
+
+    def export(self, content_type, writer, after_id, options):
+        model = CONTENT_TYPES[content_type]
+        fields = ["id", "title", "body", "video_link", "created_at"]
+        if model is PaidContent:
+            fields.append("price")
+        rows = (
+            model.objects.filter(pk__gt=after_id)
+            .order_by("pk")
+            .values(*fields, author=F("user__username"))
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        exported = 0
+        for row in rows:
+            row["type"] = content_type
+            row["created_at"] = row["created_at"].isoformat()
+            writer.writerow(row)
+            exported += 1
+            if exported % options["chunk_size"] == 0:
+                self.stderr.write(f"{content_type}: выгружено {exported}")
+        self.stderr.write(f"{content_type}: выгружено {exported}")
+        return exported
+
+    def read_last_ids(self, path, format):
+        """Наибольший id каждого типа в уже выгруженном файле"""
+
+        last_ids = {}
+        with open(path, newline="", encoding="utf-8") as file:
+            for _, row in read_rows(file, format):
+                last_ids[row["type"]] = max(
+                    int(row["id"]), last_ids.get(row["type"], 0)
+                )
+        return last_ids
@@ -0,0 +1,178 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes.content_io import CONTENT_TYPES, FORMATS, detect_format, read_rows
+from notes.entitlements import invalidate_entitlements
+from notes.models import PaidContent, build_excerpt
+from notes.page_cache import invalidate_free_content_pages
+from notes.search import update_search_vector
+from users.models import CustomUser
+
+# Номер последней сохраненной записи хранится в файле рядом с входным:
+# в отличие от кеша он не теряется при очистке или вытеснении ключа
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return int(file.read())
+    except FileNotFoundError:
+        raise CommandError(
+            f"Нет файла {path} с местом остановки, продолжать нечего. "
+            "Запустите загрузку без --resume"
+        )
+
+
+def write_checkpoint(path, position):
+    # Запись через временный файл: прерванная запись не портит номер
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(str(position))
+    os.replace(path + ".tmp", path)
+
+
+class Command(BaseCommand):
+    """Команда загружает контент из файла JSONL или CSV.
+
+    Файл читается построчно, записи создаются через bulk_create пачками,
+    каждая пачка - в отдельной транзакции. Номер последней сохраненной
+    записи хранится в файле <путь>.checkpoint, поэтому прерванную загрузку
+    можно продолжить с --resume. Поля id и created_at из файла не переносятся.
+    """
+
+    help = "Загружает бесплатный и платный контент из JSONL или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument(
+            "--type",
+            choices=CONTENT_TYPES,
+            help="Тип контента для записей без поля type",
+        )
+        parser.add_argument(
+            "--user",
+            help="Имя автора для всех записей вместо поля author из файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество записей, сохраняемых за одну транзакцию",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить с записи, на которой остановился прошлый запуск",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.user_ids = {}
+        if options["user"]:
+            self.default_user_id = self.get_user_ids([options["user"]]).get(
+                options["user"]
+            )
+            if self.default_user_id is None:
+                raise CommandError(f"Пользователь {options['user']} не найден")
+
+        path = options["path"]
+        checkpoint = path + CHECKPOINT_SUFFIX
+        if options["resume"]:
+            skip = read_checkpoint(checkpoint)
+        else:
+            skip = 0
+            write_checkpoint(checkpoint, skip)
+        format = detect_format(path, options["format"])
+        started = time.monotonic()
+        imported = 0
+        paid_authors = set()
+
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = islice(read_rows(file, format), skip, None)
+            while True:
+                batch = list(islice(rows, options["batch_size"]))
+                if not batch:
+                    break
+                objects = self.build_objects(batch)
+                with transaction.atomic():
+                    for model, instances in objects.items():
+                        created = model.objects.bulk_create(instances)
+                        update_search_vector(
+                            model.objects.filter(pk__in=[obj.pk for obj in created])
+                        )
+                        if model is PaidContent:
+                            paid_authors |= {obj.user_id for obj in created}
+                position = batch[-1][0]
+                write_checkpoint(checkpoint, position)
+                imported += len(batch)
+                elapsed = max(time.monotonic() - started, 0.001)
+                self.stdout.write(
+                    f"Загружено записей: {imported} (строка {position}), "
+                    f"{imported / elapsed:.0f} записей/с"
+                )
+
+        os.remove(checkpoint)
+        # bulk_create не отправляет сигналы, кеши сбрасываются вручную
+        invalidate_free_content_pages()
+        invalidate_entitlements(*(paid_authors - {None}))
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено записей: {imported} за {elapsed:.1f} с "
+                f"({imported / elapsed:.0f} записей/с)"
+            )
+        )
+
+    def get_user_ids(self, usernames):
+        missing = set(usernames) - self.user_ids.keys()
+        if missing:
+            found = dict(
+                CustomUser.objects.filter(username__in=missing).values_list(
+                    "username", "id"
+                )
+            )
+            self.user_ids.update({name: found.get(name) for name in missing})
+        return self.user_ids
+
+    def build_objects(self, batch):
+        """Экземпляры моделей пачки, сгруппированные по типу контента"""
+
+        if not self.options["user"]:
+            self.get_user_ids({row.get("author") or "" for _, row in batch})
+        objects = {}
+        for position, row in batch:
+            content_type = row.get("type") or self.options["type"]
+            model = CONTENT_TYPES.get(content_type)
+            if model is None:
+                raise CommandError(
+                    f"Запись {position}: неизвестный тип {content_type!r}"
+                )
+            if not row.get("title"):
+                raise CommandError(f"Запись {position}: не указано название")
+            if self.options["user"]:
+                user_id = self.default_user_id
+            else:
+                author = row.get("author") or ""
+                user_id = self.user_ids.get(author)
+                # Пустой автор допустим, несуществующий - ошибка в файле
+                if author and user_id is None:
+                    raise CommandError(f"Запись {position}: автор {author!r} не найден")
+            fields = {
+                "user_id": user_id,
+                "title": row["title"],
+                "body": row.get("body") or "",
+                "excerpt": build_excerpt(row.get("body")),
+                "video_link": row.get("video_link") or None,
+            }
+            if model is PaidContent:
+                try:
+                    fields["price"] = int(row.get("price") or 0)
+                except ValueError:
+                    raise CommandError(f"Запись {position}: некорректная цена")
+            objects.setdefault(model, []).append(model(**fields))
+        return objects
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0008_contentpayment_status_alter_paidcontent_body_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="freecontent",
+            name="excerpt",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Заполняется автоматически из текста записи",
+                max_length=200,
+                verbose_name="Краткое содержание",
+            ),
+        ),
+        migrations.AddField(
+            model_name="paidcontent",
+            name="excerpt",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Заполняется автоматически из текста записи",
+                max_length=200,
+                verbose_name="Краткое содержание",
+            ),
+        ),
+    ]
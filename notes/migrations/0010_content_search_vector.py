@@ -0,0 +1,67 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """GIN-индекс создается только на PostgreSQL, SQLite его не поддерживает"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    config = settings.CONTENT_SEARCH_CONFIG
+    vector = django.contrib.postgres.search.SearchVector(
+        "title", weight="A", config=config
+    ) + django.contrib.postgres.search.SearchVector("body", weight="B", config=config)
+    for model_name in ("FreeContent", "PaidContent"):
+        apps.get_model("notes", model_name).objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0009_content_excerpt"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="freecontent",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.AddField(
+            model_name="paidcontent",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        PostgresOnlyAddIndex(
+            model_name="freecontent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="freecontent_search_gin"
+            ),
+        ),
+        PostgresOnlyAddIndex(
+            model_name="paidcontent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="paidcontent_search_gin"
+            ),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0010_content_search_vector"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contentpayment",
+            name="payment_link",
+            field=models.URLField(
+                blank=True,
+                help_text="Укажите ссылку на оплату",
+                max_length=400,
+                verbose_name="Ссылка на оплату",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="contentpayment",
+            name="session_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Укажите id сессии",
+                max_length=250,
+                verbose_name="id сессии",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0011_payment_session_optional"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contentpayment",
+            name="session_id",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Укажите id сессии",
+                max_length=250,
+                verbose_name="id сессии",
+            ),
+        ),
+    ]
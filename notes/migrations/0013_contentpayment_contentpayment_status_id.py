@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0012_alter_contentpayment_session_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contentpayment",
+            index=models.Index(
+                fields=["status", "id"], name="contentpayment_status_id"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0013_contentpayment_contentpayment_status_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="freecontent",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата создания",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="freecontent",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+        migrations.AddField(
+            model_name="paidcontent",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата создания",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="paidcontent",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+    ]
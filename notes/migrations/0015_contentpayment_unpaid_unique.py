@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def expire_duplicate_payments(apps, schema_editor):
+    """Оставляет только последнюю неоплаченную запись, остальные помечает истекшими"""
+
+    model = apps.get_model("notes", "ContentPayment")
+    newer = model.objects.filter(
+        status="unpaid",
+        user=OuterRef("user"),
+        paid_content=OuterRef("paid_content"),
+        pk__gt=OuterRef("pk"),
+    )
+    model.objects.filter(status="unpaid").filter(Exists(newer)).update(status="expired")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0014_content_timestamps"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(expire_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="contentpayment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "unpaid")),
+                fields=("user", "paid_content"),
+                name="contentpayment_unpaid_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:25
+
+import config.storage
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0015_contentpayment_unpaid_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaidContentAttachment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        help_text="Загрузите файл",
+                        max_length=255,
+                        storage=config.storage.protected_storage,
+                        upload_to="paid_content/%Y/%m",
+                        verbose_name="Файл",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(
+                        blank=True,
+                        help_text="Введите название файла",
+                        max_length=150,
+                        verbose_name="Название файла",
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        default=0, editable=False, verbose_name="Размер файла в байтах"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата загрузки"
+                    ),
+                ),
+                (
+                    "content",
+                    models.ForeignKey(
+                        help_text="Укажите платную запись",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachments",
+                        to="notes.paidcontent",
+                        verbose_name="Платная запись",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл платной записи",
+                "verbose_name_plural": "Файлы платных записей",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -1,5 +1,21 @@
+import os
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils.text import Truncator
+
+from config.storage import protected_storage
 from users.models import CustomUser
+from .search import update_search_vector
+
+EXCERPT_LENGTH = 200
+
+
+def build_excerpt(body):
+    """Формирует краткое содержание записи для списков контента"""
+
+    return Truncator(body or "").chars(EXCERPT_LENGTH)
 
 
 class Content(models.Model):
@@ -29,6 +45,15 @@ class Content(models.Model):
         help_text="Введите запись",
     )
 
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH,
+        default="",
+        blank=True,
+        editable=False,
+        verbose_name="Краткое содержание",
+        help_text="Заполняется автоматически из текста записи",
+    )
+
     video_link = models.URLField(
         max_length=500,
         null=True,
@@ -37,8 +62,38 @@ class Content(models.Model):
         help_text="Введите ссылку на видео-материал",
     )
 
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор",
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата создания",
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+
     class Meta:
         abstract = True
+        indexes = [GinIndex(fields=["search_vector"], name="%(class)s_search_gin")]
+
+    def save(self, *args, **kwargs):
+        self.excerpt = build_excerpt(self.body)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            # auto_now сохраняется только если поле указано в update_fields
+            extra = (
+                {"excerpt", "updated_at"} if "body" in update_fields else {"updated_at"}
+            )
+            kwargs["update_fields"] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+        if update_fields is None or {"title", "body"} & set(update_fields):
+            update_search_vector(type(self).objects.filter(pk=self.pk))
 
 
 class FreeContent(Content):
@@ -59,6 +114,60 @@ class PaidContent(Content):
     )
 
 
+class PaidContentAttachment(models.Model):
+    """Модель файла платной записи, доступного только покупателям"""
+
+    content = models.ForeignKey(
+        PaidContent,
+        on_delete=models.CASCADE,
+        related_name="attachments",
+        verbose_name="Платная запись",
+        help_text="Укажите платную запись",
+    )
+
+    file = models.FileField(
+        upload_to="paid_content/%Y/%m",
+        storage=protected_storage,
+        max_length=255,
+        verbose_name="Файл",
+        help_text="Загрузите файл",
+    )
+
+    title = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name="Название файла",
+        help_text="Введите название файла",
+    )
+
+    size = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Размер файла в байтах",
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата загрузки",
+    )
+
+    def save(self, *args, **kwargs):
+        self.size = self.file.size
+        super().save(*args, **kwargs)
+
+    @property
+    def filename(self):
+        return os.path.basename(self.file.name)
+
+    def __str__(self):
+        return self.title or self.filename
+
+    class Meta:
+        verbose_name = "Файл платной записи"
+        verbose_name_plural = "Файлы платных записей"
+        ordering = ["id"]
+
+
 class ContentPayment(models.Model):
     """Модель оплаты контента"""
 
@@ -98,7 +207,8 @@ class ContentPayment(models.Model):
 
     session_id = models.CharField(
         max_length=250,
-        blank=False,
+        db_index=True,
+        blank=True,
         null=False,
         verbose_name="id сессии",
         help_text="Укажите id сессии",
@@ -106,7 +216,7 @@ class ContentPayment(models.Model):
 
     payment_link = models.URLField(
         max_length=400,
-        blank=False,
+        blank=True,
         null=False,
         verbose_name="Ссылка на оплату",
         help_text="Укажите ссылку на оплату",
@@ -128,6 +238,17 @@ class ContentPayment(models.Model):
         verbose_name = "Покупка доступа к контенту"
         verbose_name_plural = "Покупки доступа к контенту"
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "id"], name="contentpayment_status_id")
+        ]
+        constraints = [
+            # Не больше одной неоплаченной покупки контента на пользователя
+            models.UniqueConstraint(
+                fields=["user", "paid_content"],
+                condition=models.Q(status="unpaid"),
+                name="contentpayment_unpaid_unique",
+            )
+        ]
 
 
 class BuyerSubscription(models.Model):
@@ -0,0 +1,110 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+# Номер версии меняется при любом изменении бесплатного контента, страницы
+# со старой версией в ключе перестают читаться и вытесняются по таймауту
+FREE_CONTENT_VERSION_KEY = "page_cache:free_content:version"
+# Заголовки ответа, которые сохраняются вместе со страницей
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+# Сколько ждать, пока страницу отрисует другой процесс, и как часто проверять
+LOCK_WAIT = 2
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_page_version():
+    return cache.get_or_set(FREE_CONTENT_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_free_content_pages():
+    """Сбрасывает закешированные страницы бесплатного контента"""
+
+    cache.add(FREE_CONTENT_VERSION_KEY, 1, timeout=None)
+    try:
+        cache.incr(FREE_CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.set(FREE_CONTENT_VERSION_KEY, 2, timeout=None)
+
+
+class AnonymousPageCacheMixin:
+    """Mixin кеширования страницы целиком для анонимных посетителей.
+
+    Страница хранится в кеше под ключом с текущей версией контента. При
+    промахе страницу отрисовывает только один процесс (блокировка через
+    cache.add), остальные получают предыдущую версию страницы или ждут
+    результат, поэтому после сброса кеша база не получает всплеск запросов.
+    Авторизованные пользователи получают страницу без кеша.
+    """
+
+    page_cache_prefix = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET" or request.user.is_authenticated:
+            response = super().dispatch(request, *args, **kwargs)
+        else:
+            response = self.cached_dispatch(request, *args, **kwargs)
+        # Для анонимных и авторизованных посетителей страницы отличаются
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    def page_cache_keys(self, request):
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        base = f"page_cache:{self.page_cache_prefix}:{path_hash}"
+        return f"{base}:v{get_page_version()}", f"{base}:stale", f"{base}:lock"
+
+    def cached_dispatch(self, request, *args, **kwargs):
+        key, stale_key, lock_key = self.page_cache_keys(request)
+        page = cache.get(key)
+        if page is not None:
+            return self.page_response(request, page, "HIT")
+
+        locked = cache.add(lock_key, 1, timeout=LOCK_WAIT * 2)
+        if not locked:
+            stale = cache.get(stale_key)
+            if stale is not None:
+                return self.page_response(request, stale, "STALE")
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                page = cache.get(key)
+                if page is not None:
+                    return self.page_response(request, page, "HIT")
+            # Блокировку держит другой процесс, страница отрисовывается без
+            # записи в кеш и без снятия чужой блокировки
+            response = super().dispatch(request, *args, **kwargs)
+            response["X-Page-Cache"] = "MISS"
+            return response
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            if response.status_code == 200:
+                headers = {
+                    name: response[name] for name in CACHED_HEADERS if name in response
+                }
+                page = (response.content, headers)
+                cache.set_many(
+                    {key: page, stale_key: page}, timeout=settings.PAGE_CACHE_TIMEOUT
+                )
+        finally:
+            cache.delete(lock_key)
+        response["X-Page-Cache"] = "MISS"
+        return response
+
+    def page_response(self, request, page, state):
+        content, headers = page
+        response = HttpResponse(content, headers=headers)
+        response["X-Page-Cache"] = state
+        # Закешированная страница тоже отвечает 304 на условный запрос
+        return get_conditional_response(
+            request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+            response=response,
+        )
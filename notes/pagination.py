@@ -0,0 +1,81 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.http import Http404
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+
+
+def encode_cursor(direction, pk):
+    """Кодирует направление и id граничной записи в непрозрачный курсор"""
+
+    raw = f"{direction}:{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Декодирует курсор, возвращает пару (направление, id)"""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, pk = base64.urlsafe_b64decode(padded).decode().split(":")
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404("Некорректный курсор страницы")
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pk < 1:
+        raise Http404("Некорректный курсор страницы")
+    return direction, pk
+
+
+class KeysetPaginationMixin:
+    """Mixin для постраничного вывода списка по курсору (keyset pagination).
+
+    Записи упорядочены по убыванию id, страница выбирается условием по id
+    граничной записи, поэтому стоимость запроса не зависит от номера страницы.
+    """
+
+    page_size = None
+    cursor_param = "cursor"
+
+    def get_page_size(self):
+        return self.page_size or settings.CONTENT_PAGE_SIZE
+
+    def paginate_keyset(self, queryset):
+        page_size = self.get_page_size()
+        cursor = self.request.GET.get(self.cursor_param)
+        direction, pk = decode_cursor(cursor) if cursor else (CURSOR_NEXT, None)
+
+        if direction == CURSOR_PREVIOUS:
+            rows = list(queryset.filter(pk__gt=pk).order_by("pk")[: page_size + 1])
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = True
+        else:
+            if pk is not None:
+                queryset = queryset.filter(pk__lt=pk)
+            rows = list(queryset.order_by("-pk")[: page_size + 1])
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_previous = pk is not None
+
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(CURSOR_NEXT, rows[-1].pk)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(CURSOR_PREVIOUS, rows[0].pk)
+        return rows, next_cursor, previous_cursor
+
+    def get_context_data(self, **kwargs):
+        rows, next_cursor, previous_cursor = self.paginate_keyset(self.object_list)
+        context = super().get_context_data(object_list=rows, **kwargs)
+        context.update(
+            {
+                "next_cursor": next_cursor,
+                "previous_cursor": previous_cursor,
+                "is_paginated": bool(next_cursor or previous_cursor),
+            }
+        )
+        return context
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Q
+
+
+def is_postgresql(using):
+    return connections[using].vendor == "postgresql"
+
+
+def content_search_vector():
+    """Выражение поискового вектора записи: заголовок весомее текста"""
+
+    config = settings.CONTENT_SEARCH_CONFIG
+    return SearchVector("title", weight="A", config=config) + SearchVector(
+        "body", weight="B", config=config
+    )
+
+
+def update_search_vector(queryset):
+    """Пересчитывает поисковый вектор у записей queryset (только PostgreSQL)"""
+
+    if is_postgresql(queryset.db):
+        queryset.update(search_vector=content_search_vector())
+
+
+def search_content(queryset, query):
+    """Возвращает записи, подходящие под запрос, упорядоченные по релевантности.
+
+    На PostgreSQL используется индексированный tsvector, на остальных СУБД
+    (SQLite в тестах) - поиск подстроки в заголовке и тексте.
+    """
+
+    if is_postgresql(queryset.db):
+        search_query = SearchQuery(
+            query, search_type="websearch", config=settings.CONTENT_SEARCH_CONFIG
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-pk")
+        )
+    return queryset.filter(
+        Q(title__icontains=query) | Q(body__icontains=query)
+    ).order_by("-pk")
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+
+
+class FreeContentSerializer(serializers.Serializer):
+    """Описание записи бесплатного контента в API.
+
+    Представления API отдают словари из values() напрямую, сериализатор
+    описывает формат ответа для документации (drf_yasg).
+    """
+
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    excerpt = serializers.CharField()
+    body = serializers.CharField(allow_null=True, required=False)
+    video_link = serializers.URLField(allow_null=True)
+    author = serializers.CharField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+
+
+class PaidContentSerializer(FreeContentSerializer):
+    """Описание записи платного контента в API, текст только при наличии доступа"""
+
+    price = serializers.IntegerField()
+    has_access = serializers.BooleanField()
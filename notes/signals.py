@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import StripeCatalogEntry
+from .entitlements import invalidate_entitlements
+from .models import BuyerSubscription, FreeContent, PaidContent, PaidContentAttachment
+from .page_cache import invalidate_free_content_pages
+
+
+@receiver(post_save, sender=BuyerSubscription)
+@receiver(post_delete, sender=BuyerSubscription)
+def reset_subscriber_entitlements(sender, instance, **kwargs):
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_init, sender=PaidContent)
+def remember_content_owner(sender, instance, **kwargs):
+    # Через __dict__, чтобы не подгружать отложенное поле при .only()
+    instance._loaded_user_id = instance.__dict__.get("user_id")
+
+
+@receiver(post_save, sender=PaidContent)
+def reset_owner_entitlements(sender, instance, created, **kwargs):
+    if created or instance._loaded_user_id != instance.user_id:
+        invalidate_entitlements(instance._loaded_user_id, instance.user_id)
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver(post_delete, sender=PaidContent)
+def reset_deleted_content_entitlements(sender, instance, **kwargs):
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_init, sender=PaidContent)
+def remember_content_price(sender, instance, **kwargs):
+    instance._loaded_price = instance.__dict__.get("price")
+
+
+@receiver(post_save, sender=PaidContent)
+def reset_stripe_price(sender, instance, created, **kwargs):
+    # Цена Stripe неизменяема: при смене цены контента ее нужно создать заново
+    if not created and instance._loaded_price != instance.price:
+        StripeCatalogEntry.objects.filter(paid_content=instance).update(price_id="")
+    instance._loaded_price = instance.price
+
+
+@receiver(post_save, sender=FreeContent)
+@receiver(post_delete, sender=FreeContent)
+def reset_free_content_pages(sender, instance, **kwargs):
+    invalidate_free_content_pages()
+
+
+@receiver(post_save, sender=PaidContentAttachment)
+@receiver(post_delete, sender=PaidContentAttachment)
+def touch_attachment_content(sender, instance, **kwargs):
+    # Список файлов входит в страницу записи, ее ETag зависит от updated_at
+    PaidContent.objects.filter(pk=instance.content_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=PaidContentAttachment)
+def delete_attachment_file(sender, instance, **kwargs):
+    instance.file.delete(save=False)
@@ -1,10 +1,55 @@
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from users.avatars import select_variant
 
 register = template.Library()
 
 
 @register.filter()
 def media_filter(path):
+    """Адрес медиафайла с версией, которую меняет перезапись файла"""
     if path:
-        return f"/media/{path}"
+        return default_storage.url(str(path))
     return "#"
+
+
+def variant_srcset(variants, size, format):
+    """srcset из миниатюр для обычных экранов и экранов высокой плотности"""
+
+    candidates = []
+    for density in (1, 2):
+        path = select_variant(variants, size * density, format)
+        if path and path not in [candidate for candidate, _ in candidates]:
+            candidates.append((path, density))
+    return ", ".join(
+        f"{default_storage.url(path)} {density}x" for path, density in candidates
+    )
+
+
+@register.simple_tag
+def avatar(user, size=150):
+    """Фото профиля: WebP с запасным JPEG подходящего размера"""
+
+    if not user.avatar:
+        return ""
+    variants = user.avatar_variants
+    if not variants.get("sizes"):
+        # Миниатюры еще не созданы фоновой задачей
+        return format_html(
+            '<img src="{}" width="{}" height="{}" alt="">',
+            media_filter(user.avatar),
+            size,
+            size,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" width="{}" height="{}" alt="" loading="lazy">'
+        "</picture>",
+        variant_srcset(variants, size, "webp"),
+        default_storage.url(select_variant(variants, size, "jpeg")),
+        variant_srcset(variants, size, "jpeg"),
+        size,
+        size,
+    )
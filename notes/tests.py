@@ -1,8 +1,39 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
 from django.contrib.auth import get_user_model
-from notes.models import FreeContent, PaidContent, BuyerSubscription, ContentPayment
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+from django.core.management import CommandError, call_command
+from notes.models import (
+    FreeContent,
+    PaidContent,
+    PaidContentAttachment,
+    BuyerSubscription,
+    ContentPayment,
+    EXCERPT_LENGTH,
+    build_excerpt,
+)
+from notes.entitlements import get_entitled_content_ids
+from notes.templatetags.my_tags import media_filter
+from config.storage import brotli
+from notes.pagination import CURSOR_NEXT, encode_cursor
+from notes.views import FreeContentListView, PaidContentListView, create_payment
+from config.queries import QueryBudgetExceeded
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from unittest import skipUnless
 from unittest.mock import patch
+from rest_framework_simplejwt.tokens import RefreshToken
 
 User = get_user_model()
 
@@ -162,17 +193,794 @@ class BuyContentSubscriptionTests(TestCase):
 
     @patch("stripe.PaymentIntent.retrieve")
     def test_buy_content_subscription_success(self, mock_retrieve):
-        mock_retrieve.return_value = {"status": "succeeded"}
-        self.assertIsNotNone(self.content.id, "Content ID should not be None")
-        payment = ContentPayment.objects.create(
-            user=self.user, paid_content=self.content, session_id="test_session_id"
+        """Оплаченная покупка ведет к контенту без обращения к Stripe"""
+        ContentPayment.objects.create(
+            user=self.user,
+            paid_content=self.content,
+            session_id="test_session_id",
+            status="paid",
         )
         response = self.client.post(
             reverse("notes:buy_paid_content", kwargs={"pk": self.content.id})
         )
-        self.user.refresh_from_db()
+        mock_retrieve.assert_not_called()
+        self.assertRedirects(
+            response, reverse("notes:paid_content_retrieve", args=[self.content.id])
+        )
+
+    def test_buy_content_creates_checkout_in_background(self):
+        """Новая покупка сохраняется сразу, ссылку на оплату создает задача"""
+        response = self.client.get(
+            reverse("notes:buy_paid_content", kwargs={"pk": self.content.id})
+        )
+        self.assertEqual(response.status_code, 200)
+        payment = ContentPayment.objects.get(user=self.user, paid_content=self.content)
+        self.assertEqual(payment.payment_amount, self.content.price * 100)
+        self.assertTrue(payment.session_id.startswith("cs_fake_"))
+        self.assertTrue(payment.payment_link)
+
+    # Бюджет представления рассчитан на создание сессии в задаче, здесь
+    # первая покупка еще и создает позицию каталога Stripe внутри запроса
+    @override_settings(STRIPE_ASYNC_CHECKOUT=True, QUERY_BUDGET_STRICT=False)
+    def test_buy_content_async_checkout(self):
+        """Под ASGI сессия оплаты создается прямо в представлении"""
+        response = self.client.get(
+            reverse("notes:buy_paid_content", kwargs={"pk": self.content.id})
+        )
+        payment = response.context["payment"]
+        self.assertTrue(payment.session_id.startswith("cs_fake_"))
+        self.assertContains(response, payment.payment_link)
+        self.assertNotContains(response, 'http-equiv="refresh"')
+
+    def test_repeated_purchase_reuses_unpaid_payment(self):
+        """Повторное создание покупки не создает вторую запись и сессию Stripe"""
+        request = RequestFactory().post("/")
+        request.user = self.user
+        with patch("notes.views.arequest_checkout") as request_checkout:
+            request_checkout.side_effect = lambda payment, content: payment
+            first = async_to_sync(create_payment)(request, self.content)
+            second = async_to_sync(create_payment)(request, self.content)
+        self.assertEqual(first.pk, second.pk)
+        request_checkout.assert_called_once()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ContentPayment.objects.create(user=self.user, paid_content=self.content)
+
+    def test_buy_content_restarts_lost_checkout(self):
+        """Повторная отправка формы запускает потерянную задачу создания сессии"""
+        payment = ContentPayment.objects.create(
+            user=self.user, paid_content=self.content
+        )
+        self.client.post(
+            reverse("notes:buy_paid_content", kwargs={"pk": self.content.id})
+        )
         payment.refresh_from_db()
-        self.assertTrue(self.user.subscription, "User subscription should be True")
-        self.assertEqual(payment.status, "paid")
+        self.assertTrue(payment.session_id.startswith("cs_fake_"))
+        self.assertEqual(ContentPayment.objects.count(), 1)
+
+    def test_buy_content_pending_checkout_page_polls(self):
+        ContentPayment.objects.create(user=self.user, paid_content=self.content)
+        response = self.client.get(
+            reverse("notes:buy_paid_content", kwargs={"pk": self.content.id})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'http-equiv="refresh"')
+
+
+@override_settings(CONTENT_PAGE_SIZE=2)
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.posts = [
+            FreeContent.objects.create(user=self.user, title=f"Post {i}")
+            for i in range(5)
+        ]
+
+    def test_first_page(self):
+        """Первая страница содержит самые новые записи и ссылку вперед"""
+        response = self.client.get(reverse("notes:free_content_list"))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "notes/paid_content_detail.html")
+        self.assertEqual(
+            [post.title for post in response.context["free_content"]],
+            ["Post 4", "Post 3"],
+        )
+        self.assertIsNotNone(response.context["next_cursor"])
+        self.assertIsNone(response.context["previous_cursor"])
+
+    def test_next_and_previous_pages(self):
+        """Переход вперед и обратно по курсорам возвращает те же записи"""
+        url = reverse("notes:free_content_list")
+        first = self.client.get(url)
+        second = self.client.get(url, {"cursor": first.context["next_cursor"]})
+        self.assertEqual(
+            [post.title for post in second.context["free_content"]],
+            ["Post 2", "Post 1"],
+        )
+        back = self.client.get(url, {"cursor": second.context["previous_cursor"]})
+        self.assertEqual(
+            [post.title for post in back.context["free_content"]],
+            ["Post 4", "Post 3"],
+        )
+        self.assertIsNone(back.context["previous_cursor"])
+
+    def test_last_page(self):
+        """На последней странице нет ссылки вперед"""
+        url = reverse("notes:free_content_list")
+        cursor = encode_cursor(CURSOR_NEXT, self.posts[1].pk)
+        response = self.client.get(url, {"cursor": cursor})
+        self.assertEqual(
+            [post.title for post in response.context["free_content"]], ["Post 0"]
+        )
+        self.assertIsNone(response.context["next_cursor"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse("notes:free_content_list"), {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentExcerptTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+
+    def test_excerpt_filled_on_save(self):
+        content = FreeContent.objects.create(
+            user=self.user, title="Test", body="Длинный текст записи " * 50
+        )
+        self.assertEqual(content.excerpt, build_excerpt(content.body))
+        self.assertLessEqual(len(content.excerpt), EXCERPT_LENGTH)
+
+    def test_list_does_not_load_body(self):
+        PaidContent.objects.create(
+            user=self.user, title="Test", body="Текст записи", price=100
+        )
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(reverse("notes:paid_content_list"))
+        post = response.context["paid_content"][0]
+        self.assertIn("body", post.get_deferred_fields())
+        self.assertContains(response, "Текст записи")
+
+    def test_backfill_excerpts_command(self):
+        content = FreeContent.objects.create(
+            user=self.user, title="Test", body="Текст записи"
+        )
+        FreeContent.objects.filter(pk=content.pk).update(excerpt="")
+        call_command("backfill_excerpts", stdout=StringIO())
+        content.refresh_from_db()
+        self.assertEqual(content.excerpt, "Текст записи")
+
+
+class ContentSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.match = FreeContent.objects.create(
+            user=self.user, title="Рецепт борща", body="Свекла и капуста"
+        )
+        self.other = FreeContent.objects.create(
+            user=self.user, title="Путешествие", body="Горы и море"
+        )
+
+    def test_search_by_title_and_body(self):
+        url = reverse("notes:free_content_search")
+        for query in ("борща", "капуста"):
+            response = self.client.get(url, {"q": query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context["results"]), [self.match])
+
+    def test_empty_query(self):
+        response = self.client.get(reverse("notes:free_content_search"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["results"]), [])
+
+    def test_paid_content_search(self):
+        content = PaidContent.objects.create(
+            user=self.user, title="Курс по борщу", price=100
+        )
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(reverse("notes:paid_content_search"), {"q": "борщу"})
+        self.assertContains(
+            response, reverse("notes:paid_content_retrieve", args=[content.pk])
+        )
+
+
+class EntitlementCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.buyer = User.objects.create_user(
+            username="buyer", password="pass", phone_number="79990000001"
+        )
+        self.content = PaidContent.objects.create(
+            user=self.author, title="Paid", body="Paid body", price=100
+        )
+        self.url = reverse("notes:paid_content_retrieve", args=[self.content.pk])
+        self.client.login(username="buyer", password="pass")
+
+    def test_access_granted_after_subscription(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        BuyerSubscription.objects.create(user=self.buyer, content=self.content)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_access_revoked_after_subscription_deleted(self):
+        subscription = BuyerSubscription.objects.create(
+            user=self.buyer, content=self.content
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        subscription.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_ownership_change_invalidates_cache(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.content.user = self.buyer
+        self.content.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertNotIn(self.content.pk, get_entitled_content_ids(self.author))
+
+    def test_warm_detail_queries(self):
+        """Повторный просмотр: сессия, пользователь, сама запись и ее файлы"""
+        BuyerSubscription.objects.create(user=self.buyer, content=self.content)
+        self.client.get(self.url)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Paid body")
+
+
+class PaidContentAccessAnnotationTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.buyer = User.objects.create_user(
+            username="buyer", password="pass", phone_number="79990000001"
+        )
+        self.own = PaidContent.objects.create(user=self.buyer, title="Own", price=1)
+        self.bought = PaidContent.objects.create(
+            user=self.author, title="Bought", price=1
+        )
+        self.locked = PaidContent.objects.create(
+            user=self.author, title="Locked", price=1
+        )
+        BuyerSubscription.objects.create(user=self.buyer, content=self.bought)
+        self.client.login(username="buyer", password="pass")
+
+    def test_access_flags(self):
+        response = self.client.get(reverse("notes:paid_content_list"))
+        flags = {
+            post.title: (post.is_owner, post.has_access)
+            for post in response.context["paid_content"]
+        }
+        self.assertEqual(
+            flags,
+            {
+                "Own": (True, True),
+                "Bought": (False, True),
+                "Locked": (False, False),
+            },
+        )
+        self.assertContains(
+            response, reverse("notes:buy_paid_content", args=[self.locked.pk])
+        )
+        self.assertNotContains(
+            response, reverse("notes:buy_paid_content", args=[self.bought.pk])
+        )
+
+    def test_constant_query_count(self):
+        """Число запросов не зависит от количества карточек на странице"""
+        for i in range(10):
+            PaidContent.objects.create(user=self.author, title=f"Post {i}", price=1)
+        with self.assertNumQueries(3):
+            self.client.get(reverse("notes:paid_content_list"))
+
+
+@override_settings(DEBUG=True)
+class QueryBudgetTests(TestCase):
+    """Бюджеты SQL-запросов представлений не зависят от количества записей"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword", subscription=True
+        )
+        self.author = User.objects.create_user(
+            username="author", password="testpassword", phone_number="79990000001"
+        )
+        self.client.login(username="testuser", password="testpassword")
+        for i in range(3):
+            FreeContent.objects.create(user=self.user, title=f"Free {i}", body="Текст")
+            paid = PaidContent.objects.create(
+                user=self.author, title=f"Paid {i}", body="Текст", price=10
+            )
+            BuyerSubscription.objects.create(user=self.user, content=paid)
+        self.free = FreeContent.objects.first()
+        self.paid = PaidContent.objects.first()
+        self.unpurchased = PaidContent.objects.create(
+            user=self.author, title="New", price=10
+        )
+
+    def test_views_within_budget(self):
+        urls = [
+            reverse("notes:free_content_list"),
+            reverse("notes:free_content_search") + "?q=Free",
+            reverse("notes:free_content_retrieve", args=[self.free.pk]),
+            reverse("notes:free_content_create"),
+            reverse("notes:free_content_update", args=[self.free.pk]),
+            reverse("notes:free_content_destroy", args=[self.free.pk]),
+            reverse("notes:paid_content_list"),
+            reverse("notes:paid_content_search") + "?q=Paid",
+            reverse("notes:paid_content_retrieve", args=[self.paid.pk]),
+            reverse("notes:paid_content_create"),
+            reverse("notes:paid_content_update", args=[self.paid.pk]),
+            reverse("notes:paid_content_destroy", args=[self.paid.pk]),
+            reverse("notes:buy_paid_content", args=[self.unpurchased.pk]),
+            reverse("notes:buy_paid_content", args=[self.unpurchased.pk]),
+            reverse("notes:my_content"),
+            reverse("notes:contacts"),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    int(response["X-DB-Queries"]), int(response["X-DB-Query-Budget"])
+                )
+
+    def test_budget_exceeded(self):
+        with patch.object(PaidContentListView, "query_budget", 1):
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs(
+                "django.request", "ERROR"
+            ):
+                self.client.get(reverse("notes:paid_content_list"))
+
+    def test_query_headers(self):
+        self.client.get(reverse("notes:free_content_list"))
+        response = self.client.get(reverse("notes:free_content_list"))
+        self.assertEqual(response["X-DB-Query-Budget"], "3")
+        self.assertEqual(response["X-DB-Duplicate-Queries"], "0")
+        self.assertIn("X-DB-Time-Ms", response)
+
+
+class ServerTimingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        FreeContent.objects.create(user=self.user, title="Free", body="Текст")
+
+    def test_server_timing_header(self):
+        with self.assertLogs("config.timing", "INFO") as logs:
+            response = self.client.get(reverse("notes:free_content_list"))
+        header = response["Server-Timing"]
+        self.assertIn("db;dur=", header)
+        self.assertIn('desc="Database x1"', header)
+        self.assertIn("tpl;dur=", header)
+        self.assertIn("total;dur=", header)
+        self.assertIn('"view": "notes:free_content_list"', logs.output[0])
+
+    async def test_server_timing_async_client(self):
+        response = await self.async_client.get(reverse("notes:free_content_list"))
+        self.assertIn('desc="Database x1"', response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        response = self.client.get(reverse("notes:free_content_list"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.content = FreeContent.objects.create(
+            user=self.user, title="Первая запись", body="Текст"
+        )
+        self.url = reverse("notes:free_content_list")
+
+    def test_anonymous_hit_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertIn("Cookie", response["Vary"])
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertContains(response, "Первая запись")
+
+    def test_invalidated_on_save_and_delete(self):
+        detail_url = reverse("notes:free_content_retrieve", args=[self.content.pk])
+        self.client.get(self.url)
+        self.client.get(detail_url)
+        self.content.title = "Новый заголовок"
+        self.content.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "Новый заголовок")
+        self.assertContains(self.client.get(detail_url), "Новый заголовок")
+        self.content.delete()
+        self.assertNotContains(self.client.get(self.url), "Новый заголовок")
+
+    def test_stale_page_while_regenerating(self):
+        self.client.get(self.url)
+        FreeContent.objects.create(user=self.user, title="Вторая запись")
+        # Страницу новой версии уже отрисовывает другой процесс
+        _, _, lock_key = FreeContentListView().page_cache_keys(
+            RequestFactory().get(self.url)
+        )
+        cache.add(lock_key, 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "STALE")
+        self.assertNotContains(response, "Вторая запись")
+
+    @patch("notes.page_cache.LOCK_WAIT", 0)
+    def test_foreign_lock_kept_after_wait(self):
+        _, _, lock_key = FreeContentListView().page_cache_keys(
+            RequestFactory().get(self.url)
+        )
+        cache.add(lock_key, 1)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "Первая запись")
+        # Блокировка другого процесса осталась на месте
+        self.assertEqual(cache.get(lock_key), 1)
+
+    def test_authenticated_not_cached(self):
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertIn("Cookie", response["Vary"])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.free = FreeContent.objects.create(
+            user=self.user, title="Free", body="Текст"
+        )
+        self.paid = PaidContent.objects.create(
+            user=self.user, title="Paid", body="Текст", price=10
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_content_timestamps(self):
+        created_at = self.free.created_at
+        self.free.title = "Changed"
+        self.free.save(update_fields=["title"])
+        self.free.refresh_from_db()
+        self.assertEqual(self.free.created_at, created_at)
+        self.assertGreater(self.free.updated_at, created_at)
+
+    def test_not_modified_without_rendering(self):
+        for url in (
+            reverse("notes:free_content_retrieve", args=[self.free.pk]),
+            reverse("notes:paid_content_retrieve", args=[self.paid.pk]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("Last-Modified", response)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_etag_changes_after_update(self):
+        url = reverse("notes:free_content_retrieve", args=[self.free.pk])
+        etag = self.client.get(url)["ETag"]
+        self.free.body = "Новый текст"
+        self.free.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_differs_between_users(self):
+        url = reverse("notes:free_content_retrieve", args=[self.free.pk])
+        etag = self.client.get(url)["ETag"]
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.client.get(url)["ETag"])
+
+
+class ContentAPITests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.buyer = User.objects.create_user(
+            username="buyer", password="pass", phone_number="79990000001"
+        )
+        for i in range(3):
+            FreeContent.objects.create(
+                user=self.author, title=f"Free {i}", body="Текст"
+            )
+        self.paid = PaidContent.objects.create(
+            user=self.author,
+            title="Paid",
+            body="Секрет",
+            price=10,
+            video_link="http://paid.example/video",
+        )
+
+    def authorize(self, user):
+        token = RefreshToken.for_user(user).access_token
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_free_list_cursor_pagination(self):
+        url = reverse("api_v1:free_content_list")
+        response = self.client.get(url, {"page_size": 2})
+        data = response.json()
+        self.assertEqual(
+            [row["title"] for row in data["results"]], ["Free 2", "Free 1"]
+        )
+        self.assertEqual(data["results"][0]["author"], "author")
+        self.assertNotIn("user_id", data["results"][0])
+        self.assertNotIn("body", data["results"][0])
+        data = self.client.get(data["next"]).json()
+        self.assertEqual([row["title"] for row in data["results"]], ["Free 0"])
+        self.assertIsNone(data["next"])
+
+    def test_paid_body_requires_entitlement(self):
+        url = reverse("api_v1:paid_content_retrieve", args=[self.paid.pk])
+        data = self.client.get(url).json()
+        self.assertFalse(data["has_access"])
+        self.assertIsNone(data["body"])
+        data = self.client.get(url, **self.authorize(self.buyer)).json()
+        self.assertIsNone(data["body"])
+
+        BuyerSubscription.objects.create(user=self.buyer, content=self.paid)
+        data = self.client.get(url, **self.authorize(self.buyer)).json()
+        self.assertTrue(data["has_access"])
+        self.assertEqual(data["body"], "Секрет")
+        data = self.client.get(url, **self.authorize(self.author)).json()
+        self.assertEqual(data["body"], "Секрет")
+
+    def test_paid_materials_hidden_without_access(self):
+        self.paid.body = "Секрет " * 50
+        self.paid.save()
+        for url in (
+            reverse("api_v1:paid_content_retrieve", args=[self.paid.pk]),
+            reverse("api_v1:paid_content_list"),
+        ):
+            for headers in ({}, self.authorize(self.buyer)):
+                with self.subTest(url=url, authorized=bool(headers)):
+                    data = self.client.get(url, **headers).json()
+                    row = data["results"][0] if "results" in data else data
+                    self.assertFalse(row["has_access"])
+                    self.assertIsNone(row["video_link"])
+                    self.assertLessEqual(len(row["excerpt"]), 30)
+        data = self.client.get(
+            reverse("api_v1:paid_content_retrieve", args=[self.paid.pk]),
+            **self.authorize(self.author),
+        ).json()
+        self.assertEqual(data["video_link"], "http://paid.example/video")
+        self.assertEqual(data["excerpt"], self.paid.excerpt)
+
+    def test_paid_list_access_flags(self):
+        BuyerSubscription.objects.create(user=self.buyer, content=self.paid)
+        response = self.client.get(
+            reverse("api_v1:paid_content_list"), **self.authorize(self.buyer)
+        )
+        self.assertEqual(response.json()["results"][0]["has_access"], True)
+
+    def test_detail_not_modified_and_not_found(self):
+        url = reverse(
+            "api_v1:free_content_retrieve", args=[FreeContent.objects.first().pk]
+        )
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse("api_v1:free_content_retrieve", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentImportExportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="author", password="pass")
+        FreeContent.objects.create(user=self.user, title="Free", body="free body")
+        PaidContent.objects.create(
+            user=self.user, title="Paid", body="paid body", price=300
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_export_import_roundtrip(self):
+        for name in ("content.jsonl", "content.csv"):
+            with self.subTest(name=name):
+                path = self.path(name)
+                call_command("export_content", path, stderr=StringIO())
+                call_command("import_content", path, stdout=StringIO())
+                paid = PaidContent.objects.filter(title="Paid").last()
+                self.assertEqual(paid.price, 300)
+                self.assertEqual(paid.user, self.user)
+                self.assertEqual(paid.excerpt, "paid body")
+        self.assertEqual(FreeContent.objects.filter(title="Free").count(), 4)
+        self.assertEqual(PaidContent.objects.filter(title="Paid").count(), 4)
+
+    def test_import_unknown_author(self):
+        path = self.path("content.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for author in ("author", "nobody"):
+                row = {"type": "free", "title": "Imported", "author": author}
+                file.write(json.dumps(row) + "\n")
+
+        with self.assertRaisesMessage(CommandError, "Запись 2: автор 'nobody'"):
+            call_command("import_content", path, stdout=StringIO())
+        self.assertFalse(FreeContent.objects.filter(title="Imported").exists())
+
+    def test_export_resume_appends_new_rows(self):
+        path = self.path("content.jsonl")
+        call_command("export_content", path, type="free", stderr=StringIO())
+        FreeContent.objects.create(user=self.user, title="Second")
+        call_command(
+            "export_content", path, type="free", resume=True, stderr=StringIO()
+        )
+        with open(path, encoding="utf-8") as file:
+            titles = [json.loads(line)["title"] for line in file]
+        self.assertEqual(titles, ["Free", "Second"])
+
+    def test_import_resume_skips_saved_rows(self):
+        path = self.path("content.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for title in ("one", "two", "", "four"):
+                file.write(json.dumps({"type": "free", "title": title}) + "\n")
+
+        with self.assertRaisesMessage(CommandError, "Запись 3"):
+            call_command("import_content", path, batch_size=2, stdout=StringIO())
+        self.assertEqual(FreeContent.objects.count(), 3)
+
+        with open(path, "w", encoding="utf-8") as file:
+            for title in ("one", "two", "three", "four"):
+                file.write(json.dumps({"type": "free", "title": title}) + "\n")
+        # Место остановки не зависит от кеша
+        cache.clear()
+        call_command(
+            "import_content", path, batch_size=2, resume=True, stdout=StringIO()
+        )
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+        with self.assertRaisesMessage(CommandError, "без --resume"):
+            call_command("import_content", path, resume=True, stdout=StringIO())
+        self.assertEqual(
+            list(
+                FreeContent.objects.exclude(title="Free")
+                .order_by("pk")
+                .values_list("title", flat=True)
+            ),
+            ["one", "two", "three", "four"],
+        )
+
+
+class StaticFilesTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+
+    def collectstatic(self, **options):
+        with override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {
+                    "BACKEND": "config.storage.CompressedManifestStaticFilesStorage",
+                    "OPTIONS": options,
+                },
+            },
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            url = staticfiles_storage.url("css/bootstrap.min.css")
+        return os.path.join(self.root, url.removeprefix("/static/"))
+
+    def test_collectstatic_hashes_and_precompresses(self):
+        path = self.collectstatic(precompress_brotli=False)
+        self.assertRegex(path, r"/css/bootstrap\.min\.[0-9a-f]{12}\.css$")
+        with open(path, "rb") as file, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(compressed.read(), file.read())
+        self.assertFalse(os.path.exists(path + ".br"))
+
+    @skipUnless(brotli, "пакет Brotli не установлен")
+    def test_collectstatic_brotli(self):
+        path = self.collectstatic()
+        with open(path, "rb") as file, open(path + ".br", "rb") as compressed:
+            self.assertEqual(brotli.decompress(compressed.read()), file.read())
+
+    @patch("config.storage.brotli", None)
+    def test_collectstatic_fails_without_brotli(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "Brotli"):
+            self.collectstatic()
+
+    def test_media_url_changes_when_file_is_replaced(self):
+        with override_settings(MEDIA_ROOT=self.root):
+            default_storage.save("users/avatars/a.jpg", ContentFile(b"first"))
+            first = media_filter("users/avatars/a.jpg")
+            path = default_storage.path("users/avatars/a.jpg")
+            os.utime(path, (1, 1))
+            second = media_filter("users/avatars/a.jpg")
+        self.assertRegex(first, r"^/media/users/avatars/a\.jpg\?v=[0-9a-f]+$")
+        self.assertNotEqual(first, second)
+        self.assertEqual(media_filter(""), "#")
+
+
+class PaidContentAttachmentTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        field = PaidContentAttachment._meta.get_field("file")
+        patcher = patch.object(field, "storage", FileSystemStorage(root.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.buyer = User.objects.create_user(username="buyer", password="pass")
+        self.content = PaidContent.objects.create(
+            user=self.author, title="Paid", price=100
+        )
+        self.attachment = PaidContentAttachment.objects.create(
+            content=self.content,
+            file=SimpleUploadedFile("lesson.pdf", b"%PDF-1.4 lesson"),
+        )
+        self.url = reverse(
+            "notes:paid_content_attachment_download", args=[self.attachment.pk]
+        )
+
+    def test_download_requires_access(self):
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        BuyerSubscription.objects.create(user=self.buyer, content=self.content)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 lesson")
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    @override_settings(PROTECTED_MEDIA_ACCEL_PREFIX="/protected/")
+    def test_download_delegated_to_nginx(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/{self.attachment.file.name}"
+        )
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response.content, b"")
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_only_author_uploads_files(self):
+        url = reverse("notes:paid_content_attachment_create", args=[self.content.pk])
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.author)
+        response = self.client.post(
+            url, {"title": "Audio", "file": SimpleUploadedFile("a.mp3", b"ID3")}
+        )
+        self.assertRedirects(
+            response, reverse("notes:paid_content_retrieve", args=[self.content.pk])
+        )
+        attachment = self.content.attachments.get(title="Audio")
+        self.assertEqual(attachment.size, 3)
+        response = self.client.get(
+            reverse("notes:paid_content_retrieve", args=[self.content.pk])
+        )
+        self.assertContains(response, "Audio")
@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     PaidContentCreateView,
     PaidContentDetailView,
+    PaidContentAttachmentCreateView,
     PaidContentUpdateView,
     PaidContentDeleteView,
     PaidContentListView,
@@ -11,9 +12,12 @@ from .views import (
     FreeContentUpdateView,
     FreeContentDeleteView,
     FreeContentListView,
+    FreeContentSearchView,
+    PaidContentSearchView,
     MyContentListView,
     buy_content_subscription,
     contacts,
+    download_attachment,
 )
 
 app_name = NotesConfig.name
@@ -21,6 +25,11 @@ app_name = NotesConfig.name
 urlpatterns = [
     path("content/my_content/", MyContentListView.as_view(), name="my_content"),
     path("content/free/", FreeContentListView.as_view(), name="free_content_list"),
+    path(
+        "content/free/search/",
+        FreeContentSearchView.as_view(),
+        name="free_content_search",
+    ),
     path(
         "content/free/create/",
         FreeContentCreateView.as_view(),
@@ -42,6 +51,11 @@ urlpatterns = [
         name="free_content_destroy",
     ),
     path("content/paid/", PaidContentListView.as_view(), name="paid_content_list"),
+    path(
+        "content/paid/search/",
+        PaidContentSearchView.as_view(),
+        name="paid_content_search",
+    ),
     path(
         "content/paid/create/",
         PaidContentCreateView.as_view(),
@@ -62,6 +76,16 @@ urlpatterns = [
         PaidContentDeleteView.as_view(),
         name="paid_content_destroy",
     ),
+    path(
+        "content/paid/<int:pk>/attachments/add/",
+        PaidContentAttachmentCreateView.as_view(),
+        name="paid_content_attachment_create",
+    ),
+    path(
+        "content/paid/attachments/<int:pk>/",
+        download_attachment,
+        name="paid_content_attachment_download",
+    ),
     path(
         "content/paid/<int:pk>/buy/",
         buy_content_subscription,
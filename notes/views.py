@@ -1,38 +1,97 @@
-import stripe
+import hashlib
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
-from django.shortcuts import render, get_object_or_404
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, Value
+from django.shortcuts import aget_object_or_404, redirect, render, get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import content_disposition_header, http_date, quote_etag
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic import ListView, DetailView, TemplateView
-from users.services import create_stripe_price, create_stripe_session
-from .forms import FreeContentForm, PaidContentForm
-from .models import PaidContent, FreeContent, BuyerSubscription, ContentPayment
+from users import stripe_client
+from users.tasks import arequest_checkout
+from .forms import FreeContentForm, PaidContentAttachmentForm, PaidContentForm
+from .models import (
+    PaidContent,
+    PaidContentAttachment,
+    FreeContent,
+    BuyerSubscription,
+    ContentPayment,
+)
+from .entitlements import has_content_access
+from .page_cache import AnonymousPageCacheMixin
+from .pagination import KeysetPaginationMixin
+from .search import search_content
+from config.queries import query_budget
 from users.permissions import IsOwner, IsModer
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
 
+@query_budget(2)
 def contacts(request):
     return render(request, "notes/contacts.html")
 
 
 class BuyerSubscriptionMixin:
-    """Mixin для проверки активной подписки на контент у пользователя."""
+    """Mixin для проверки активной подписки на контент у пользователя.
+
+    Запись загружается один раз и переиспользуется в get_object(),
+    права доступа берутся из кеша (см. notes.entitlements).
+    """
 
     def dispatch(self, request, *args, **kwargs):
-        content_id = kwargs.get("pk")
-        content = get_object_or_404(PaidContent, id=content_id)
-        user = request.user
-        subscription = BuyerSubscription.objects.filter(
-            content=content, user=user, is_active=True
-        ).exists()
-        if content.user != user:
-            if not subscription:
-                return HttpResponseForbidden(
-                    "Вы не подписаны на этот контент. Требуется покупка подписки."
-                )
+        self.object = get_object_or_404(
+            PaidContent.objects.select_related("user"), pk=kwargs.get("pk")
+        )
+        if not has_content_access(request.user, self.object):
+            return HttpResponseForbidden(
+                "Вы не подписаны на этот контент. Требуется покупка подписки."
+            )
         return super().dispatch(request, *args, **kwargs)
 
+    def get_object(self, queryset=None):
+        return self.object
+
+
+class ConditionalDetailMixin:
+    """Mixin условного GET для страницы записи (ETag и Last-Modified).
+
+    Заголовки вычисляются по updated_at уже загруженной записи и данным
+    пользователя, от которых зависит шапка страницы. При совпадении
+    If-None-Match или If-Modified-Since ответ 304 отдается без отрисовки шаблона.
+    """
+
+    def get_etag(self, obj):
+        user = self.request.user
+        raw = (
+            f"{obj._meta.label_lower}:{obj.pk}:{obj.updated_at.isoformat()}:"
+            f"{user.pk}:{getattr(user, 'subscription', False)}"
+        )
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        etag = self.get_etag(self.object)
+        last_modified = int(self.object.updated_at.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            context = self.get_context_data(object=self.object)
+            response = self.render_to_response(context)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
 
 class UserSubscribedMixin:
     """Mixin для проверки активной подписки на сервис у пользователя."""
@@ -54,11 +113,16 @@ class MyContentListView(TemplateView):
     permission_classes = [
         AllowAny,
     ]
+    query_budget = 4
 
     def get(self, request, *args, **kwargs):
         self.extra_context = {
-            "free_content": FreeContent.objects.filter(user=request.user.id),
-            "paid_content": PaidContent.objects.filter(user=request.user.id),
+            "free_content": FreeContent.objects.filter(user=request.user.id).only(
+                "id", "title", "excerpt"
+            ),
+            "paid_content": PaidContent.objects.filter(user=request.user.id).only(
+                "id", "title", "excerpt", "price"
+            ),
         }
         return self.render_to_response(self.extra_context)
 
@@ -73,6 +137,7 @@ class PaidContentCreateView(CreateView, UserSubscribedMixin):
     permission_classes = [
         IsAuthenticated,
     ]
+    query_budget = 3
 
     def form_valid(self, form):
         user = self.request.user
@@ -80,7 +145,7 @@ class PaidContentCreateView(CreateView, UserSubscribedMixin):
         return super().form_valid(form)
 
 
-class PaidContentDetailView(BuyerSubscriptionMixin, DetailView):
+class PaidContentDetailView(BuyerSubscriptionMixin, ConditionalDetailMixin, DetailView):
     """Контроллер просмотра объекта модели платного контента"""
 
     model = PaidContent
@@ -90,6 +155,73 @@ class PaidContentDetailView(BuyerSubscriptionMixin, DetailView):
         IsOwner,
         IsModer,
     ]
+    query_budget = 5
+
+
+class PaidContentAttachmentCreateView(CreateView):
+    """Контроллер загрузки файла к платному контенту, доступен только автору"""
+
+    model = PaidContentAttachment
+    form_class = PaidContentAttachmentForm
+    template_name = "notes/paid_content_attachment_create.html"
+    query_budget = 5
+
+    def dispatch(self, request, *args, **kwargs):
+        self.content = get_object_or_404(PaidContent, pk=kwargs.get("pk"))
+        if not request.user.is_authenticated or self.content.user_id != request.user.pk:
+            return HttpResponseForbidden("Добавлять файлы может только автор записи.")
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        form.instance.content = self.content
+        return super().form_valid(form)
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(paid_content=self.content, **kwargs)
+
+    def get_success_url(self):
+        return reverse_lazy("notes:paid_content_retrieve", args=[self.content.pk])
+
+
+def attachment_response(attachment):
+    """Ответ с файлом платной записи.
+
+    При PROTECTED_MEDIA_ACCEL_PREFIX файл передает nginx по заголовку
+    X-Accel-Redirect (с поддержкой Range), рабочий процесс приложения
+    освобождается сразу. Без него файл отдает Django через FileResponse.
+    """
+
+    name = attachment.file.name
+    if not settings.PROTECTED_MEDIA_ACCEL_PREFIX:
+        response = FileResponse(
+            attachment.file.open("rb"), as_attachment=True, filename=attachment.filename
+        )
+    else:
+        response = HttpResponse(
+            content_type=mimetypes.guess_type(name)[0] or "application/octet-stream"
+        )
+        response["X-Accel-Redirect"] = settings.PROTECTED_MEDIA_ACCEL_PREFIX + quote(
+            name
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, attachment.filename
+        )
+    patch_cache_control(response, private=True)
+    return response
+
+
+@query_budget(4)
+@login_required
+def download_attachment(request, pk):
+    """Скачивание файла платной записи автором или покупателем"""
+    attachment = get_object_or_404(
+        PaidContentAttachment.objects.select_related("content"), pk=pk
+    )
+    if not has_content_access(request.user, attachment.content):
+        return HttpResponseForbidden(
+            "Вы не подписаны на этот контент. Требуется покупка подписки."
+        )
+    return attachment_response(attachment)
 
 
 class PaidContentUpdateView(UpdateView):
@@ -102,6 +234,7 @@ class PaidContentUpdateView(UpdateView):
         IsOwner,
         IsModer,
     ]
+    query_budget = 3
 
     def get_success_url(self):
         return reverse_lazy("notes:paid_content_retrieve", args=[self.object.pk])
@@ -115,20 +248,44 @@ class PaidContentDeleteView(DeleteView):
         IsOwner,
         IsModer,
     ]
+    query_budget = 6
     context_object_name = "paid_content"
     template_name = "notes/paid_content_destroy.html"
     success_url = reverse_lazy("notes:paid_content_list")
 
 
-class PaidContentListView(ListView):
+class PaidContentListView(KeysetPaginationMixin, ListView):
     """Контроллер просмотра списка объектов модели платного контента"""
 
     model = PaidContent
+    queryset = PaidContent.objects.only("id", "title", "excerpt", "price")
     template_name = "notes/paid_content_list.html"
     context_object_name = "paid_content"
     permission_classes = [
         IsAuthenticated,
     ]
+    query_budget = 3
+
+    def get_queryset(self):
+        """Отмечает для каждой записи, владеет ли ей пользователь и есть ли доступ"""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_owner=Value(False, output_field=BooleanField()),
+                has_access=Value(False, output_field=BooleanField()),
+            )
+        subscribed = Exists(
+            BuyerSubscription.objects.filter(
+                user=user, content=OuterRef("pk"), is_active=True
+            )
+        )
+        return queryset.annotate(
+            is_owner=ExpressionWrapper(Q(user=user), output_field=BooleanField()),
+            has_access=ExpressionWrapper(
+                Q(user=user) | Q(subscribed), output_field=BooleanField()
+            ),
+        )
 
 
 class FreeContentCreateView(CreateView):
@@ -141,6 +298,7 @@ class FreeContentCreateView(CreateView):
     permission_classes = [
         AllowAny,
     ]
+    query_budget = 3
 
     def form_valid(self, form):
         user = self.request.user
@@ -148,15 +306,19 @@ class FreeContentCreateView(CreateView):
         return super().form_valid(form)
 
 
-class FreeContentDetailView(DetailView):
+class FreeContentDetailView(
+    AnonymousPageCacheMixin, ConditionalDetailMixin, DetailView
+):
     """Контроллер просмотра объекта модели бесплатного контента"""
 
-    model = FreeContent
+    queryset = FreeContent.objects.select_related("user")
     context_object_name = "free_content"
     template_name = "notes/free_content_detail.html"
     permission_classes = [
         AllowAny,
     ]
+    query_budget = 3
+    page_cache_prefix = "free_content_detail"
 
 
 class FreeContentUpdateView(UpdateView):
@@ -170,6 +332,7 @@ class FreeContentUpdateView(UpdateView):
         IsOwner,
         IsModer,
     ]
+    query_budget = 3
 
     def form_valid(self, form):
         form.save
@@ -184,67 +347,112 @@ class FreeContentDeleteView(DeleteView):
         IsOwner,
         IsModer,
     ]
+    query_budget = 5
     context_object_name = "free_content"
     template_name = "notes/free_content_destroy.html"
     success_url = reverse_lazy("notes:free_content_list")
 
 
-class FreeContentListView(ListView):
+class FreeContentListView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     """Контроллер просмотра списка объектов модели бесплатного контента"""
 
     model = FreeContent
+    queryset = FreeContent.objects.only("id", "title", "excerpt")
     template_name = "notes/free_content_list.html"
     context_object_name = "free_content"
     permission_classes = [
         AllowAny,
     ]
+    query_budget = 3
+    page_cache_prefix = "free_content_list"
+
+
+class ContentSearchMixin:
+    """Mixin полнотекстового поиска по заголовку и тексту записей"""
 
+    template_name = "notes/content_search.html"
+    context_object_name = "results"
+    detail_url_name = None
 
-def create_payment(request, price, pk):
-    content = get_object_or_404(PaidContent, id=pk)
-    payment_amount = create_stripe_price(price * 100)
-    payment_session = create_stripe_session(payment_amount)
-    session_id = payment_session.get("id")
-    payment_link = payment_session.get("url")
-    payment = ContentPayment.objects.create(
+    def get_paginate_by(self, queryset):
+        return settings.CONTENT_PAGE_SIZE
+
+    def get_queryset(self):
+        self.query = self.request.GET.get("q", "").strip()
+        if not self.query:
+            return self.model.objects.none()
+        queryset = self.model.objects.only("id", "title", "excerpt")
+        return search_content(queryset, self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["query"] = self.query
+        context["detail_url_name"] = self.detail_url_name
+        return context
+
+
+class FreeContentSearchView(ContentSearchMixin, ListView):
+    """Контроллер поиска по бесплатному контенту"""
+
+    model = FreeContent
+    detail_url_name = "notes:free_content_retrieve"
+    permission_classes = [
+        AllowAny,
+    ]
+    query_budget = 4
+
+
+class PaidContentSearchView(ContentSearchMixin, ListView):
+    """Контроллер поиска по платному контенту"""
+
+    model = PaidContent
+    detail_url_name = "notes:paid_content_retrieve"
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    query_budget = 4
+
+
+async def create_payment(request, content):
+    """Создает неоплаченную покупку и запускает создание сессии Stripe.
+
+    Уникальное ограничение на неоплаченные покупки делает создание
+    идемпотентным: параллельный запрос получит уже созданную запись,
+    и сессия Stripe будет создана только один раз.
+    """
+    payment, created = await ContentPayment.objects.aget_or_create(
         user=request.user,
-        payment_amount=payment_amount["unit_amount"],
-        payment_link=payment_link,
-        session_id=session_id,
         paid_content=content,
+        status="unpaid",
+        defaults={"payment_amount": content.price * 100},
     )
-    payment.save()
-    return payment
+    if not created:
+        return payment
+    return await arequest_checkout(payment, content)
 
 
+@query_budget(9)
 @login_required
-def buy_content_subscription(request, pk):
-    content = get_object_or_404(PaidContent, id=pk)
-    content_price = content.price
-    payment_exists = ContentPayment.objects.filter(
-        user=request.user, paid_content=content
-    ).exists()
-
-    if payment_exists:
-        payment = ContentPayment.objects.get(user=request.user, paid_content=content)
-
-        try:
-            response = stripe.PaymentIntent.retrieve(payment.session_id)
-
-            if response["status"] == "succeeded":
-                request.user.subscription = True
-                request.user.save()
-                payment.status = "paid"
-                payment.save()
-                return render(request, "notes/paid_content_detail.html")
-            else:
-                context = {"payment": payment}
-                return render(request, "notes/buy_paid_content.html", context)
-        except Exception as ex:
-            context = {"payment": payment}
-            print(ex)
-            return render(request, "notes/buy_paid_content.html", context)
-
-    payment = create_payment(request, content_price, pk)
-    context = {"payment": payment}
+async def buy_content_subscription(request, pk):
+    """Покупка доступа к контенту. Статус оплаты обновляет вебхук Stripe"""
+    request.user = await request.auser()
+    content = await aget_object_or_404(PaidContent, id=pk)
+    payment = (
+        await ContentPayment.objects.filter(user=request.user, paid_content=content)
+        .order_by("-created_at")
+        .afirst()
+    )
+    if payment is not None and payment.status == "paid":
+        return redirect("notes:paid_content_retrieve", pk=content.pk)
+    if payment is None or (
+        request.method == "POST" and payment.status in ("failed", "expired")
+    ):
+        if not await stripe_client.ais_available():
+            return render(request, "users/stripe_unavailable.html", status=503)
+        payment = await create_payment(request, content)
+    elif request.method == "POST" and not payment.session_id:
+        # Задача создания сессии могла не попасть в очередь или упасть,
+        # повторная отправка формы запускает ее снова
+        payment = await arequest_checkout(payment, content)
+    context = {"payment": payment, "content": content}
     return render(request, "notes/buy_paid_content.html", context)
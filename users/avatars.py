@@ -0,0 +1,116 @@
+"""Обработка фото профиля: удаление метаданных, миниатюры и варианты WebP.
+
+Загруженное фото пересохраняется без EXIF (в нем бывают координаты съемки)
+и с ограниченным размером, для каждой стороны из AVATAR_SIZES создаются
+квадратные миниатюры в JPEG и WebP. Пути к ним хранятся в поле
+avatar_variants пользователя.
+"""
+
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = "users/avatars/variants"
+# Формат -> (расширение, параметры сохранения Pillow)
+FORMATS = {
+    "webp": ("webp", {"quality": 80, "method": 6}),
+    "jpeg": ("jpg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def encode(image, format):
+    buffer = BytesIO()
+    options = FORMATS[format][1]
+    image.save(buffer, format.upper(), **options)
+    return ContentFile(buffer.getvalue())
+
+
+def replace_file(name, content):
+    """Сохраняет файл под тем же именем, не добавляя суффикс к имени.
+
+    Только для файлов в каталоге миниатюр пользователя: другие пути могут
+    принадлежать чужим загрузкам.
+    """
+
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+def open_image(file):
+    with Image.open(file) as image:
+        # Поворот по EXIF применяется до удаления метаданных
+        image = ImageOps.exif_transpose(image)
+        return image.convert("RGB")
+
+
+def build_variants(user):
+    """Пересохраняет фото пользователя и создает его миниатюры.
+
+    Возвращает словарь для поля avatar_variants.
+    """
+
+    image = open_image(user.avatar)
+    original = image.copy()
+    original.thumbnail((settings.AVATAR_MAX_SIZE, settings.AVATAR_MAX_SIZE))
+    # Хранилище выбирает свободное имя: путь вида me.jpg может уже занимать
+    # фото другого пользователя. Удаляется только собственная загрузка
+    source = default_storage.save(
+        os.path.splitext(user.avatar.name)[0] + ".jpg", encode(original, "jpeg")
+    )
+    default_storage.delete(user.avatar.name)
+    user.avatar.name = source
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    sizes = {}
+    for size in settings.AVATAR_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        sizes[str(size)] = {
+            format: replace_file(
+                f"{VARIANTS_DIR}/{user.pk}/{stem}-{size}.{extension}",
+                encode(thumbnail, format),
+            )
+            for format, (extension, _) in FORMATS.items()
+        }
+
+    # Миниатюры прошлого фото с другим именем больше не нужны
+    created = {path for formats in sizes.values() for path in formats.values()}
+    for formats in user.avatar_variants.get("sizes", {}).values():
+        for path in formats.values():
+            if path not in created:
+                default_storage.delete(path)
+    return {"source": source, "sizes": sizes}
+
+
+def needs_processing(user):
+    return bool(user.avatar) and user.avatar_variants.get("source") != user.avatar.name
+
+
+def process_avatar(user, force=False):
+    """Обрабатывает фото пользователя, если миниатюры еще не созданы.
+
+    При force миниатюры пересоздаются, прежние файлы удаляются.
+    """
+
+    if not force and not needs_processing(user):
+        return False
+    user.avatar_variants = build_variants(user)
+    # Обновление через queryset не вызывает сигнал post_save повторно
+    type(user).objects.filter(pk=user.pk).update(
+        avatar=user.avatar.name, avatar_variants=user.avatar_variants
+    )
+    return True
+
+
+def select_variant(variants, size, format):
+    """Путь к наименьшей миниатюре не меньше size (или к наибольшей)"""
+
+    sizes = sorted(variants.get("sizes", {}), key=int)
+    if not sizes:
+        return None
+    chosen = next((name for name in sizes if int(name) >= size), sizes[-1])
+    return variants["sizes"][chosen].get(format)
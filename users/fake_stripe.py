@@ -0,0 +1,307 @@
+"""Локальная замена API Stripe для нагрузочного и интеграционного тестирования.
+
+Поддерживает только те методы, которые использует приложение: создание
+товаров, цен и сессий оплаты, получение и список сессий, получение
+PaymentIntent. Оплата сессии выполняется переходом по ее ссылке или
+автоматически через complete_after секунд, после чего на webhook_url
+отправляется подписанное событие, как это делает Stripe.
+
+Приложение направляется на сервер настройкой STRIPE_API_BASE.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+OBJECT_PREFIXES = {
+    "products": ("prod", "product"),
+    "prices": ("price", "price"),
+    "checkout/sessions": ("cs_test", "checkout.session"),
+    "payment_intents": ("pi", "payment_intent"),
+}
+# Коды ответов, которыми сервер имитирует сбои Stripe
+ERROR_STATUSES = (429, 500, 503)
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Заголовок Stripe-Signature для тела события"""
+
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """HTTP-сервер, хранящий созданные объекты Stripe в памяти"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0,
+        error_rate=0,
+        webhook_url="",
+        webhook_secret="",
+        complete_after=None,
+    ):
+        super().__init__(address, FakeStripeHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.complete_after = complete_after
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Удаляет все созданные объекты и события"""
+
+        self.objects = {}
+        self.sessions = []
+        self.events = []
+        self.idempotent_responses = {}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def new_object(self, resource, **fields):
+        prefix, object_name = OBJECT_PREFIXES[resource]
+        return {
+            "id": f"{prefix}_{uuid.uuid4().hex}",
+            "object": object_name,
+            "created": int(time.time()),
+            "livemode": False,
+            **fields,
+        }
+
+    def create(self, resource, **fields):
+        obj = self.new_object(resource, **fields)
+        with self.lock:
+            self.objects[obj["id"]] = obj
+            if resource == "checkout/sessions":
+                self.sessions.append(obj)
+        return obj
+
+    def create_session(self, params):
+        price = self.objects.get(params.get("line_items[0][price]"), {})
+        quantity = int(params.get("line_items[0][quantity]", 1))
+        session = self.create(
+            "checkout/sessions",
+            mode=params.get("mode", "payment"),
+            status="open",
+            payment_status="unpaid",
+            payment_intent=None,
+            success_url=params.get("success_url"),
+            amount_total=price.get("unit_amount", 0) * quantity,
+            currency=price.get("currency", "rub"),
+        )
+        session["url"] = f"{self.base_url}/checkout/{session['id']}"
+        if self.complete_after is not None:
+            timer = threading.Timer(
+                self.complete_after, self.complete_session, (session["id"],)
+            )
+            timer.daemon = True
+            timer.start()
+        return session
+
+    def list_sessions(self, params):
+        created_gte = int(params.get("created[gte]", 0))
+        limit = int(params.get("limit", 10))
+        with self.lock:
+            # Stripe возвращает сессии от новых к старым
+            sessions = [
+                s for s in reversed(self.sessions) if s["created"] >= created_gte
+            ]
+        starting_after = params.get("starting_after")
+        if starting_after:
+            ids = [session["id"] for session in sessions]
+            start = ids.index(starting_after) + 1 if starting_after in ids else 0
+            sessions = sessions[start:]
+        return {
+            "object": "list",
+            "url": "/v1/checkout/sessions",
+            "data": sessions[:limit],
+            "has_more": len(sessions) > limit,
+        }
+
+    def complete_session(self, session_id, outcome="paid"):
+        """Завершает сессию оплаты и отправляет событие о результате"""
+
+        with self.lock:
+            session = self.objects[session_id]
+            if session["status"] != "open":
+                return session
+            if outcome == "expired":
+                session["status"] = "expired"
+            else:
+                intent = self.new_object(
+                    "payment_intents",
+                    amount=session["amount_total"],
+                    currency=session["currency"],
+                    status="succeeded",
+                )
+                self.objects[intent["id"]] = intent
+                session.update(
+                    status="complete",
+                    payment_status="paid",
+                    payment_intent=intent["id"],
+                )
+        event_type = (
+            "checkout.session.expired"
+            if outcome == "expired"
+            else "checkout.session.completed"
+        )
+        self.emit_event(event_type, session)
+        return session
+
+    def build_event(self, event_type, obj):
+        event = {
+            "id": f"evt_{uuid.uuid4().hex}",
+            "object": "event",
+            "api_version": "2024-12-18.acacia",
+            "created": int(time.time()),
+            "type": event_type,
+            "livemode": False,
+            "data": {"object": dict(obj)},
+        }
+        self.events.append(event)
+        return event
+
+    def emit_event(self, event_type, obj):
+        event = self.build_event(event_type, obj)
+        if not self.webhook_url:
+            return event
+        payload = json.dumps(event)
+        try:
+            requests.post(
+                self.webhook_url,
+                data=payload,
+                headers={
+                    "Content-Type": "application/json",
+                    "Stripe-Signature": sign_payload(payload, self.webhook_secret),
+                },
+                timeout=10,
+            )
+        except requests.RequestException as exc:
+            logger.warning("Fake Stripe webhook delivery failed: %s", exc)
+        return event
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Разбирает запросы библиотеки stripe и браузера к страницам оплаты"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path.startswith("/checkout/"):
+            self.checkout_page(path.split("/")[-1], params.get("outcome", "paid"))
+            return
+        if self.simulate_failure():
+            return
+        if path == "/v1/checkout/sessions":
+            self.send_json(self.server.list_sessions(params))
+            return
+        obj = self.server.objects.get(path.split("/")[-1])
+        if obj is None or not path.startswith("/v1/"):
+            self.send_error_json(404, "invalid_request_error", "No such object")
+            return
+        self.send_json(obj)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode()
+        params = {key: values[-1] for key, values in parse_qs(body).items()}
+        if self.simulate_failure():
+            return
+        # Повтор запроса с тем же ключом возвращает ранее созданный объект
+        idempotency_key = self.headers.get("Idempotency-Key")
+        if idempotency_key in self.server.idempotent_responses:
+            self.send_json(self.server.idempotent_responses[idempotency_key])
+            return
+        resource = urlsplit(self.path).path.strip("/").removeprefix("v1/")
+        if resource == "products":
+            obj = self.server.create("products", name=params.get("name"), active=True)
+        elif resource == "prices":
+            obj = self.server.create(
+                "prices",
+                currency=params.get("currency"),
+                unit_amount=int(params.get("unit_amount", 0)),
+                product=params.get("product"),
+                active=True,
+            )
+        elif resource == "checkout/sessions":
+            obj = self.server.create_session(params)
+        else:
+            self.send_error_json(
+                404, "invalid_request_error", "Unrecognized request URL"
+            )
+            return
+        if idempotency_key:
+            self.server.idempotent_responses[idempotency_key] = obj
+        self.send_json(obj)
+
+    def checkout_page(self, session_id, outcome):
+        if session_id not in self.server.objects:
+            self.send_error_json(
+                404, "invalid_request_error", "No such checkout session"
+            )
+            return
+        session = self.server.complete_session(session_id, outcome)
+        self.send_response(302)
+        self.send_header("Location", session.get("success_url") or "/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def simulate_failure(self):
+        """Выдерживает задержку и с вероятностью error_rate отвечает ошибкой"""
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() >= self.server.error_rate:
+            return False
+        status = random.choice(ERROR_STATUSES)
+        error_type = "invalid_request_error" if status == 429 else "api_error"
+        self.send_error_json(status, error_type, "Simulated Stripe failure")
+        return True
+
+    def send_error_json(self, status, error_type, message):
+        self.send_json({"error": {"type": error_type, "message": message}}, status)
+
+    def send_json(self, data, status=200):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_fake_stripe(**options):
+    """Запускает сервер в фоновом потоке и возвращает его"""
+
+    server = FakeStripeServer(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
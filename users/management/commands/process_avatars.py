@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from users.avatars import process_avatar
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """Команда создает миниатюры для фото профиля, загруженных ранее"""
+
+    help = "Удаляет метаданные из фото профиля и создает миниатюры JPEG и WebP"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Количество записей, загружаемых из базы за один запрос",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать миниатюры, даже если они уже есть",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        users = (
+            CustomUser.objects.exclude(avatar="")
+            .exclude(avatar=None)
+            .only("id", "avatar", "avatar_variants")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        for user in users:
+            if process_avatar(user, force=options["force"]):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано фото профиля: {processed}"))
@@ -0,0 +1,206 @@
+import random
+import time
+
+import stripe
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min
+
+from notes.entitlements import invalidate_entitlements
+from notes.models import BuyerSubscription, ContentPayment
+from users.models import CustomUser, Payment
+from users.services import list_checkout_sessions
+from users.stripe_client import StripeUnavailable
+
+CHECKPOINT_KEY = "reconcile_payments:{}"
+
+
+def resolve_session_status(session):
+    """Итоговый статус оплаты по сессии Stripe или None, если оплата не завершена"""
+
+    if session.get("payment_status") in ("paid", "no_payment_required"):
+        return "paid"
+    if session.get("status") == "expired":
+        return "expired"
+    return None
+
+
+class Command(BaseCommand):
+    """Команда сверяет неоплаченные покупки и счета с сессиями оплаты Stripe.
+
+    Сессии загружаются из Stripe постранично одним проходом, записи из базы -
+    пачками по индексу (status, id). Номер последней обработанной записи
+    сохраняется в кеше, поэтому прерванную сверку можно продолжить с --resume.
+    """
+
+    help = "Сверяет неоплаченные покупки контента и подписки с Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество записей, обрабатываемых за одну транзакцию",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить с записи, на которой остановился прошлый запуск",
+        )
+        parser.add_argument(
+            "--max-requests-per-second",
+            type=float,
+            default=20,
+            help="Ограничение частоты запросов к Stripe",
+        )
+        parser.add_argument(
+            "--max-retries",
+            type=int,
+            default=5,
+            help="Количество повторов при превышении лимита запросов Stripe",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stripe_requests = 0
+        self.last_request_at = 0
+        started = time.monotonic()
+
+        models = (ContentPayment, Payment)
+        start_ids = {model: self.get_start_id(model) for model in models}
+        since = None
+        for model in models:
+            created = (
+                self.pending(model, start_ids[model])
+                .aggregate(created=Min("created_at"))
+                .get("created")
+            )
+            if created and (since is None or created < since):
+                since = created
+        if since is None:
+            self.stdout.write("Нет неоплаченных записей для сверки")
+            return
+
+        resolved = self.fetch_resolved_sessions(int(since.timestamp()))
+        scanned = updated = 0
+        for model in models:
+            model_scanned, model_updated = self.reconcile(
+                model, start_ids[model], resolved
+            )
+            scanned += model_scanned
+            updated += model_updated
+
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено записей: {scanned}, обновлено: {updated}, "
+                f"запросов к Stripe: {self.stripe_requests}, "
+                f"время: {elapsed:.1f} с, {scanned / elapsed:.0f} записей/с"
+            )
+        )
+
+    def get_start_id(self, model):
+        key = CHECKPOINT_KEY.format(model._meta.label_lower)
+        if self.options["resume"]:
+            return cache.get(key, 0)
+        cache.delete(key)
+        return 0
+
+    def pending(self, model, after_id):
+        return model.objects.filter(status="unpaid", pk__gt=after_id).exclude(
+            session_id=""
+        )
+
+    def fetch_resolved_sessions(self, created_gte):
+        """Загружает сессии Stripe, созданные после created_gte, одним проходом"""
+
+        resolved = {}
+        starting_after = None
+        while True:
+            page = self.call_stripe(list_checkout_sessions, created_gte, starting_after)
+            for session in page["data"]:
+                status = resolve_session_status(session)
+                if status:
+                    resolved[session["id"]] = status
+            if not page["has_more"] or not page["data"]:
+                return resolved
+            starting_after = page["data"][-1]["id"]
+
+    def call_stripe(self, method, *args):
+        min_interval = 1 / self.options["max_requests_per_second"]
+        for attempt in range(self.options["max_retries"] + 1):
+            wait = self.last_request_at + min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.last_request_at = time.monotonic()
+            self.stripe_requests += 1
+            try:
+                return method(*args)
+            except (stripe.error.RateLimitError, StripeUnavailable) as exc:
+                if attempt == self.options["max_retries"]:
+                    raise CommandError(f"Stripe недоступен: {exc}")
+                delay = min(2**attempt, 30) + random.uniform(0, 1)
+                self.stderr.write(f"Лимит запросов Stripe, повтор через {delay:.1f} с")
+                time.sleep(delay)
+
+    def reconcile(self, model, after_id, resolved):
+        key = CHECKPOINT_KEY.format(model._meta.label_lower)
+        scanned = updated = 0
+        while True:
+            batch = list(
+                self.pending(model, after_id).order_by("pk")[
+                    : self.options["batch_size"]
+                ]
+            )
+            if not batch:
+                cache.delete(key)
+                return scanned, updated
+            changed = []
+            for payment in batch:
+                status = resolved.get(payment.session_id)
+                if status:
+                    payment.status = status
+                    changed.append(payment)
+            with transaction.atomic():
+                model.objects.bulk_update(changed, ["status"])
+                self.grant_access(
+                    model, [payment for payment in changed if payment.status == "paid"]
+                )
+            after_id = batch[-1].pk
+            cache.set(key, after_id, timeout=None)
+            scanned += len(batch)
+            updated += len(changed)
+            self.stdout.write(
+                f"{model.__name__}: проверено {scanned}, обновлено {updated}"
+            )
+
+    def grant_access(self, model, payments):
+        if not payments:
+            return
+        user_ids = {payment.user_id for payment in payments}
+        if model is Payment:
+            CustomUser.objects.filter(pk__in=user_ids).update(subscription=True)
+            return
+
+        pairs = {(payment.user_id, payment.paid_content_id) for payment in payments}
+        existing = {
+            (user_id, content_id): (pk, is_active)
+            for pk, user_id, content_id, is_active in BuyerSubscription.objects.filter(
+                user_id__in=user_ids,
+                content_id__in={content_id for _, content_id in pairs},
+            ).values_list("id", "user_id", "content_id", "is_active")
+        }
+        BuyerSubscription.objects.bulk_create(
+            BuyerSubscription(user_id=user_id, content_id=content_id)
+            for user_id, content_id in pairs - existing.keys()
+        )
+        BuyerSubscription.objects.filter(
+            pk__in=[
+                pk
+                for pair, (pk, is_active) in existing.items()
+                if pair in pairs and not is_active
+            ]
+        ).update(is_active=True)
+        # Массовые операции не отправляют сигналы, кеш прав сбрасывается вручную
+        invalidate_entitlements(*user_ids)
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    """Команда запускает локальную замену API Stripe.
+
+    Приложение подключается к ней через переменную окружения STRIPE_API_BASE,
+    события об оплате отправляются на адрес webhook приложения.
+    """
+
+    help = "Запускает локальный сервер, имитирующий API Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0,
+            help="Задержка ответа на каждый запрос к API, с",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0,
+            help="Доля запросов, на которые возвращается ошибка 429 или 5xx",
+        )
+        parser.add_argument(
+            "--webhook-url",
+            default="http://127.0.0.1:8000/users/stripe/webhook/",
+            help="Адрес webhook приложения, пустая строка отключает отправку событий",
+        )
+        parser.add_argument(
+            "--complete-after",
+            type=float,
+            default=None,
+            help="Оплачивать сессию автоматически через указанное число секунд",
+        )
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            webhook_url=options["webhook_url"],
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+            complete_after=options["complete_after"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fake Stripe запущен: STRIPE_API_BASE={server.base_url}"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
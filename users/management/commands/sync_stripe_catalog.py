@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import PaidContent
+from users.models import StripeCatalogEntry
+from users.services import get_stripe_price_id, service_subscription_amount
+
+
+class Command(BaseCommand):
+    """Команда создает недостающие товары и цены Stripe для всего каталога"""
+
+    help = "Синхронизирует платный контент и подписку на сервис с каталогом Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Количество записей, загружаемых из базы за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        synced = {
+            entry.paid_content_id: (entry.amount, entry.price_id)
+            for entry in StripeCatalogEntry.objects.exclude(price_id="")
+        }
+        created = 0
+        unchanged = 0
+        contents = PaidContent.objects.only("id", "title", "price").iterator(
+            chunk_size=options["chunk_size"]
+        )
+        for content in contents:
+            amount = content.price * 100
+            if synced.get(content.pk, (None, None))[0] == amount:
+                unchanged += 1
+                continue
+            get_stripe_price_id(amount, content)
+            created += 1
+
+        service_amount = service_subscription_amount()
+        if synced.get(None, (None, None))[0] != service_amount:
+            get_stripe_price_id(service_amount)
+            created += 1
+        else:
+            unchanged += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано цен Stripe: {created}, без изменений: {unchanged}"
+            )
+        )
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_payment_session_optional"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_id",
+                    models.CharField(
+                        help_text="Укажите id события Stripe",
+                        max_length=255,
+                        unique=True,
+                        verbose_name="id события",
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        help_text="Укажите тип события Stripe",
+                        max_length=100,
+                        verbose_name="Тип события",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Дата получения события",
+                        verbose_name="Дата получения",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Событие Stripe",
+                "verbose_name_plural": "События Stripe",
+                "ordering": ["created_at"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="session_id",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Укажите id сессии",
+                max_length=250,
+                verbose_name="id сессии",
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0012_alter_contentpayment_session_id"),
+        ("users", "0005_stripe_webhooks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeCatalogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "product_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Укажите id товара Stripe",
+                        max_length=255,
+                        verbose_name="id товара Stripe",
+                    ),
+                ),
+                (
+                    "price_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Пустое значение - цену нужно создать заново",
+                        max_length=255,
+                        verbose_name="id цены Stripe",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Сумма, на которую создана цена Stripe",
+                        verbose_name="Сумма в копейках",
+                    ),
+                ),
+                (
+                    "paid_content",
+                    models.OneToOneField(
+                        blank=True,
+                        help_text="Пустое значение - подписка на сервис",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_catalog_entry",
+                        to="notes.paidcontent",
+                        verbose_name="Платный контент",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Позиция каталога Stripe",
+                "verbose_name_plural": "Позиции каталога Stripe",
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_stripecatalogentry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["status", "id"], name="payment_status_id"),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:09
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def expire_duplicate_payments(apps, schema_editor):
+    """Оставляет только последнюю неоплаченную запись, остальные помечает истекшими"""
+
+    model = apps.get_model("users", "Payment")
+    newer = model.objects.filter(
+        status="unpaid", user=OuterRef("user"), pk__gt=OuterRef("pk")
+    )
+    model.objects.filter(status="unpaid").filter(Exists(newer)).update(status="expired")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_payment_payment_status_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(expire_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "unpaid")),
+                fields=("user",),
+                name="payment_unpaid_unique",
+            ),
+        ),
+    ]
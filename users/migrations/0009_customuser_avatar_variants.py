@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_payment_unpaid_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Заполняется автоматически после загрузки фото",
+                verbose_name="Миниатюры фото профиля",
+            ),
+        ),
+    ]
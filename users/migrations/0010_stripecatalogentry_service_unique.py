@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:59
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def delete_duplicate_service_entries(apps, schema_editor):
+    """Оставляет одну строку подписки на сервис, предпочитая строку с ценой"""
+
+    model = apps.get_model("users", "StripeCatalogEntry")
+    entries = model.objects.filter(paid_content__isnull=True).order_by(
+        models.F("price_id").desc(), "-pk"
+    )
+    keep = entries.first()
+    if keep is not None:
+        entries.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0016_paidcontentattachment"),
+        ("users", "0009_customuser_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_service_entries, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="stripecatalogentry",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.comparison.Coalesce(
+                    "paid_content", models.Value(0)
+                ),
+                condition=models.Q(("paid_content__isnull", True)),
+                name="stripecatalogentry_service_unique",
+            ),
+        ),
+    ]
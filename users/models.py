@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Coalesce
 
 
 class CustomUser(AbstractUser):
@@ -26,6 +27,14 @@ class CustomUser(AbstractUser):
         help_text="Загрузите фото профиля пользователя",
     )
 
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Миниатюры фото профиля",
+        help_text="Заполняется автоматически после загрузки фото",
+    )
+
     phone_number = models.CharField(
         unique=True,
         max_length=35,
@@ -91,15 +100,16 @@ class Payment(models.Model):
 
     session_id = models.CharField(
         max_length=250,
+        db_index=True,
         verbose_name="id сессии",
-        blank=False,
+        blank=True,
         null=False,
         help_text="Укажите id сессии",
     )
 
     payment_link = models.URLField(
         max_length=400,
-        blank=False,
+        blank=True,
         null=False,
         verbose_name="Ссылка на оплату",
         help_text="Укажите ссылку на оплату",
@@ -115,6 +125,15 @@ class Payment(models.Model):
         verbose_name = "Оплата"
         verbose_name_plural = "Оплаты"
         ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "id"], name="payment_status_id")]
+        constraints = [
+            # Не больше одного неоплаченного счета на пользователя
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(status="unpaid"),
+                name="payment_unpaid_unique",
+            )
+        ]
 
 
 class ServiceSubscription(models.Model):
@@ -148,3 +167,84 @@ class ServiceSubscription(models.Model):
         verbose_name = "Подписка на сервис"
         verbose_name_plural = "Подписки на сервис"
         ordering = ["user"]
+
+
+class StripeEvent(models.Model):
+    """Модель обработанного события Stripe, защищает от повторной обработки"""
+
+    event_id = models.CharField(
+        unique=True,
+        max_length=255,
+        verbose_name="id события",
+        help_text="Укажите id события Stripe",
+    )
+
+    type = models.CharField(
+        max_length=100,
+        verbose_name="Тип события",
+        help_text="Укажите тип события Stripe",
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата получения",
+        help_text="Дата получения события",
+    )
+
+    def __str__(self):
+        return f"{self.type} - {self.event_id}"
+
+    class Meta:
+        verbose_name = "Событие Stripe"
+        verbose_name_plural = "События Stripe"
+        ordering = ["created_at"]
+
+
+class StripeCatalogEntry(models.Model):
+    """Модель соответствия платного контента (или подписки на сервис) товару и цене Stripe"""
+
+    paid_content = models.OneToOneField(
+        "notes.PaidContent",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="stripe_catalog_entry",
+        verbose_name="Платный контент",
+        help_text="Пустое значение - подписка на сервис",
+    )
+
+    product_id = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="id товара Stripe",
+        help_text="Укажите id товара Stripe",
+    )
+
+    price_id = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="id цены Stripe",
+        help_text="Пустое значение - цену нужно создать заново",
+    )
+
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Сумма в копейках",
+        help_text="Сумма, на которую создана цена Stripe",
+    )
+
+    def __str__(self):
+        return f"{self.paid_content or 'Подписка на сервис'} - {self.price_id}"
+
+    class Meta:
+        verbose_name = "Позиция каталога Stripe"
+        verbose_name_plural = "Позиции каталога Stripe"
+        constraints = [
+            # NULL в paid_content не участвует в уникальности OneToOneField,
+            # поэтому строка подписки на сервис ограничивается отдельно
+            models.UniqueConstraint(
+                Coalesce("paid_content", models.Value(0)),
+                condition=models.Q(paid_content__isnull=True),
+                name="stripecatalogentry_service_unique",
+            )
+        ]
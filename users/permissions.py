@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .roles import is_moder
+
 
 class IsOwner(permissions.BasePermission):
     """Класс определяет права для группы пользователей владельцев/создателей объекта"""
@@ -7,8 +9,8 @@ class IsOwner(permissions.BasePermission):
     message = "Not allowed to retrieve, update or destroy not owner's habits"
 
     def has_object_permission(self, request, view, obj):
-        if obj.owner == request.user:
-            return True
+        # Сравнение по id не загружает владельца из базы
+        return obj.user_id is not None and obj.user_id == request.user.pk
 
 
 class IsModer(permissions.BasePermission):
@@ -17,4 +19,4 @@ class IsModer(permissions.BasePermission):
     message = "Moder is allowed to create, retrieve, update and destroy content"
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="moders").exists()
+        return is_moder(request.user)
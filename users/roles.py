@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MODER_GROUP = "moders"
+
+
+def role_cache_key(user_id):
+    return f"roles:{user_id}"
+
+
+def get_user_roles(user):
+    """Возвращает множество названий групп пользователя.
+
+    Результат запоминается на объекте пользователя до конца запроса и хранится
+    в общем кеше до изменения состава групп (см. users.signals).
+    """
+
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_cached_roles", None)
+    if roles is None:
+        key = role_cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(key, roles, settings.ROLE_CACHE_TIMEOUT)
+        user._cached_roles = roles
+    return roles
+
+
+def is_moder(user):
+    return MODER_GROUP in get_user_roles(user)
+
+
+def invalidate_roles(*user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids if user_id])
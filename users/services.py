@@ -1,28 +1,179 @@
-import os
+import uuid
 
 import stripe
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
-stripe.api_key = os.environ["STRIPE_API_KEY"]
+from .models import StripeCatalogEntry
+from .stripe_client import astripe_call, stripe_call
+
+SERVICE_PRODUCT_NAME = "Подписка на сервис"
+
+
+def service_subscription_amount():
+    """Сумма подписки на сервис в копейках"""
+
+    if settings.SERVICE_SUBSCRIPTION_PRICE is None:
+        raise ImproperlyConfigured("Не задана цена подписки SERVICE_SUBSCRIPTION_PRICE")
+    return settings.SERVICE_SUBSCRIPTION_PRICE * 100
 
 
 def create_stripe_product(product):
 
-    stripe.Product.create(name=product)
+    if settings.STRIPE_FAKE_MODE:
+        return {"id": f"prod_fake_{uuid.uuid4().hex}", "name": product}
+    return stripe_call(stripe.Product.create, name=product)
 
 
-def create_stripe_price(amount):
+def create_stripe_price(amount, product_id):
 
-    price = stripe.Price.create(
-        currency="rub", unit_amount=amount, product_data={"name": "Payment"}
+    if settings.STRIPE_FAKE_MODE:
+        return {"id": f"price_fake_{uuid.uuid4().hex}", "unit_amount": amount}
+    price = stripe_call(
+        stripe.Price.create, currency="rub", unit_amount=amount, product=product_id
     )
     return price
 
 
-def create_stripe_session(price):
+def checkout_idempotency_key(payment):
+    """Ключ идемпотентности Stripe: повторы создают не больше одной сессии на платеж"""
+
+    return f"checkout-{payment._meta.label_lower}-{payment.pk}"
+
 
-    session = stripe.checkout.Session.create(
+def create_stripe_session(price_id, idempotency_key=None):
+
+    if settings.STRIPE_FAKE_MODE:
+        session_id = f"cs_fake_{uuid.uuid4().hex}"
+        return {"id": session_id, "url": f"https://checkout.stripe.test/{session_id}"}
+    session = stripe_call(
+        stripe.checkout.Session.create,
         success_url="https://127.0.0.1:8000/",
-        line_items=[{"price": price, "quantity": 1}],
+        line_items=[{"price": price_id, "quantity": 1}],
         mode="payment",
+        idempotency_key=idempotency_key,
     )
     return session
+
+
+def list_checkout_sessions(created_gte, starting_after=None, limit=100):
+    """Страница сессий оплаты Stripe, созданных не раньше created_gte"""
+
+    if settings.STRIPE_FAKE_MODE:
+        return {"data": [], "has_more": False}
+    params = {"created": {"gte": created_gte}, "limit": limit}
+    if starting_after:
+        params["starting_after"] = starting_after
+    return stripe_call(stripe.checkout.Session.list, **params)
+
+
+def get_catalog_entry(paid_content=None):
+    """Возвращает позицию каталога Stripe для контента или подписки на сервис"""
+
+    # get_or_create при конфликте уникальности перечитывает строку,
+    # созданную параллельным запросом
+    return StripeCatalogEntry.objects.get_or_create(paid_content=paid_content)[0]
+
+
+def get_stripe_price_id(amount, paid_content=None):
+    """Возвращает id цены Stripe, создавая товар и цену только при их отсутствии"""
+
+    entry = get_catalog_entry(paid_content)
+    if entry.price_id and entry.amount == amount:
+        return entry.price_id
+    if not entry.product_id:
+        name = paid_content.title if paid_content else SERVICE_PRODUCT_NAME
+        entry.product_id = create_stripe_product(name)["id"]
+    entry.price_id = create_stripe_price(amount, entry.product_id)["id"]
+    entry.amount = amount
+    entry.save(update_fields=["product_id", "price_id", "amount"])
+    return entry.price_id
+
+
+def start_checkout(payment):
+    """Создает сессию оплаты в Stripe и сохраняет ссылку в платеже"""
+
+    price_id = get_stripe_price_id(
+        payment.payment_amount, getattr(payment, "paid_content", None)
+    )
+    session = create_stripe_session(price_id, checkout_idempotency_key(payment))
+    # Сессию мог уже сохранить другой исполнитель, записывается только в
+    # платеж без сессии
+    saved = (
+        type(payment)
+        .objects.filter(pk=payment.pk, session_id="")
+        .update(session_id=session.get("id"), payment_link=session.get("url"))
+    )
+    if saved:
+        payment.session_id = session.get("id")
+        payment.payment_link = session.get("url")
+    else:
+        payment.refresh_from_db(fields=["session_id", "payment_link"])
+    return payment
+
+
+async def acreate_stripe_product(product):
+
+    if settings.STRIPE_FAKE_MODE:
+        return create_stripe_product(product)
+    return await astripe_call(stripe.Product.create_async, name=product)
+
+
+async def acreate_stripe_price(amount, product_id):
+
+    if settings.STRIPE_FAKE_MODE:
+        return create_stripe_price(amount, product_id)
+    return await astripe_call(
+        stripe.Price.create_async,
+        currency="rub",
+        unit_amount=amount,
+        product=product_id,
+    )
+
+
+async def acreate_stripe_session(price_id, idempotency_key=None):
+
+    if settings.STRIPE_FAKE_MODE:
+        return create_stripe_session(price_id, idempotency_key)
+    return await astripe_call(
+        stripe.checkout.Session.create_async,
+        success_url="https://127.0.0.1:8000/",
+        line_items=[{"price": price_id, "quantity": 1}],
+        mode="payment",
+        idempotency_key=idempotency_key,
+    )
+
+
+async def aget_stripe_price_id(amount, paid_content=None):
+    """Асинхронный вариант get_stripe_price_id"""
+
+    entry, _ = await StripeCatalogEntry.objects.aget_or_create(
+        paid_content=paid_content
+    )
+    if entry.price_id and entry.amount == amount:
+        return entry.price_id
+    if not entry.product_id:
+        name = paid_content.title if paid_content else SERVICE_PRODUCT_NAME
+        entry.product_id = (await acreate_stripe_product(name))["id"]
+    entry.price_id = (await acreate_stripe_price(amount, entry.product_id))["id"]
+    entry.amount = amount
+    await entry.asave(update_fields=["product_id", "price_id", "amount"])
+    return entry.price_id
+
+
+async def astart_checkout(payment, paid_content=None):
+    """Асинхронный вариант start_checkout для представлений под ASGI"""
+
+    price_id = await aget_stripe_price_id(payment.payment_amount, paid_content)
+    session = await acreate_stripe_session(price_id, checkout_idempotency_key(payment))
+    saved = (
+        await type(payment)
+        .objects.filter(pk=payment.pk, session_id="")
+        .aupdate(session_id=session.get("id"), payment_link=session.get("url"))
+    )
+    if saved:
+        payment.session_id = session.get("id")
+        payment.payment_link = session.get("url")
+    else:
+        await payment.arefresh_from_db(fields=["session_id", "payment_link"])
+    return payment
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from .avatars import needs_processing
+from .models import CustomUser
+from .roles import invalidate_roles
+from .tasks import process_user_avatar
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def reset_group_member_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # После очистки группы список ее участников уже не получить
+        instance._cleared_user_ids = list(
+            instance.user_set.values_list("pk", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_roles(instance.pk)
+    elif action == "post_clear":
+        invalidate_roles(*getattr(instance, "_cleared_user_ids", []))
+    else:
+        invalidate_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def reset_group_roles(sender, instance, **kwargs):
+    # Переименование или удаление группы меняет роли всех ее участников
+    if instance.pk:
+        invalidate_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=CustomUser)
+def schedule_avatar_processing(sender, instance, update_fields, **kwargs):
+    # Миниатюры создаются вне запроса, после фиксации транзакции
+    if update_fields is not None and "avatar" not in update_fields:
+        return
+    if needs_processing(instance):
+        transaction.on_commit(lambda: process_user_avatar.delay(instance.pk))
@@ -0,0 +1,153 @@
+import logging
+import time
+
+import requests
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from config.timing import timed
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, которые говорят о недоступности Stripe, а не об ошибке в запросе
+OUTAGE_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.APIError,
+    stripe.error.RateLimitError,
+)
+
+CIRCUIT_FAILURES_KEY = "stripe:circuit:failures"
+CIRCUIT_OPEN_KEY = "stripe:circuit:open"
+METRIC_KEYS = ("calls", "errors", "rejected", "latency_ms")
+
+
+class StripeUnavailable(Exception):
+    """Stripe временно недоступен, запрос отклонен без обращения к сети"""
+
+
+def build_http_client():
+    """HTTP-клиент Stripe с пулом keep-alive соединений и таймаутом.
+
+    Асинхронные методы (*_async) выполняются через httpx.AsyncClient.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.STRIPE_POOL_SIZE,
+        pool_maxsize=settings.STRIPE_POOL_SIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return stripe.RequestsClient(
+        timeout=settings.STRIPE_TIMEOUT,
+        session=session,
+        async_fallback_client=stripe.HTTPXClient(timeout=settings.STRIPE_TIMEOUT),
+    )
+
+
+def configure():
+    stripe.api_key = settings.STRIPE_API_KEY
+    if settings.STRIPE_API_BASE:
+        stripe.api_base = settings.STRIPE_API_BASE
+    # Библиотека Stripe повторяет запросы с экспоненциальной задержкой и jitter
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = build_http_client()
+
+
+def is_available():
+    """Проверяет, что автомат защиты не разомкнут после серии ошибок"""
+
+    return not cache.get(CIRCUIT_OPEN_KEY)
+
+
+def record_metric(name, value=1):
+    key = f"stripe:metrics:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, timeout=None)
+
+
+def record_call(latency_ms):
+    record_metric("calls")
+    record_metric("latency_ms", latency_ms)
+
+
+def get_metrics():
+    """Счетчики обращений к Stripe, общие для всех процессов приложения"""
+
+    values = cache.get_many([f"stripe:metrics:{name}" for name in METRIC_KEYS])
+    metrics = {name: values.get(f"stripe:metrics:{name}", 0) for name in METRIC_KEYS}
+    metrics["avg_latency_ms"] = (
+        metrics["latency_ms"] / metrics["calls"] if metrics["calls"] else 0
+    )
+    metrics["circuit_open"] = not is_available()
+    return metrics
+
+
+def record_failure():
+    cache.add(CIRCUIT_FAILURES_KEY, 0, timeout=settings.STRIPE_CIRCUIT_RESET_TIMEOUT)
+    try:
+        failures = cache.incr(CIRCUIT_FAILURES_KEY)
+    except ValueError:
+        failures = 1
+    if failures >= settings.STRIPE_CIRCUIT_FAILURE_THRESHOLD:
+        cache.set(CIRCUIT_OPEN_KEY, True, timeout=settings.STRIPE_CIRCUIT_RESET_TIMEOUT)
+        cache.delete(CIRCUIT_FAILURES_KEY)
+        logger.warning("Stripe circuit breaker opened after %s failures", failures)
+
+
+def stripe_call(method, *args, **kwargs):
+    """Вызывает метод Stripe через автомат защиты и записывает метрики.
+
+    После STRIPE_CIRCUIT_FAILURE_THRESHOLD подряд ошибок недоступности
+    следующие вызовы сразу завершаются StripeUnavailable
+    на STRIPE_CIRCUIT_RESET_TIMEOUT секунд.
+    """
+
+    if not is_available():
+        record_metric("rejected")
+        raise StripeUnavailable("Stripe временно недоступен")
+    started = time.monotonic()
+    try:
+        with timed("stripe"):
+            result = method(*args, **kwargs)
+    except OUTAGE_ERRORS:
+        record_failure()
+        record_metric("errors")
+        raise
+    finally:
+        record_call(int((time.monotonic() - started) * 1000))
+    cache.delete(CIRCUIT_FAILURES_KEY)
+    return result
+
+
+async def astripe_call(method, *args, **kwargs):
+    """Асинхронный вариант stripe_call для методов Stripe *_async"""
+
+    if not await ais_available():
+        await sync_to_async(record_metric)("rejected")
+        raise StripeUnavailable("Stripe временно недоступен")
+    started = time.monotonic()
+    try:
+        with timed("stripe"):
+            result = await method(*args, **kwargs)
+    except OUTAGE_ERRORS:
+        await sync_to_async(record_failure)()
+        await sync_to_async(record_metric)("errors")
+        raise
+    finally:
+        await sync_to_async(record_call)(int((time.monotonic() - started) * 1000))
+    await cache.adelete(CIRCUIT_FAILURES_KEY)
+    return result
+
+
+async def ais_available():
+    return not await cache.aget(CIRCUIT_OPEN_KEY)
+
+
+configure()
@@ -0,0 +1,79 @@
+import logging
+
+import stripe
+from asgiref.sync import sync_to_async
+from celery import shared_task
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import transaction
+
+from .avatars import process_avatar
+from .services import astart_checkout, start_checkout
+from .stripe_client import StripeUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def create_checkout_session(self, model_label, payment_id):
+    """Фоновое создание сессии оплаты Stripe для Payment или ContentPayment"""
+
+    model = apps.get_model(model_label)
+    # Под блокировкой строки только проверяется, что сессии еще нет;
+    # запросы к Stripe идут после коммита, чтобы не держать транзакцию.
+    # Параллельные исполнители получают от Stripe одну сессию по ключу
+    # идемпотентности, а сохраняет ее условное обновление в start_checkout
+    with transaction.atomic():
+        payment = model.objects.select_for_update().get(pk=payment_id)
+        if payment.session_id:
+            return
+    try:
+        start_checkout(payment)
+    except (stripe.error.StripeError, StripeUnavailable) as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc, countdown=2**self.request.retries)
+        model.objects.filter(pk=payment_id, session_id="").update(status="failed")
+    except Exception:
+        # Остальные ошибки повтором не исправить, без статуса failed
+        # страница покупки ждала бы ссылку бесконечно
+        model.objects.filter(pk=payment_id, session_id="").update(status="failed")
+        raise
+
+
+async def arequest_checkout(payment, paid_content=None):
+    """Запускает создание сессии оплаты из асинхронного представления.
+
+    При STRIPE_ASYNC_CHECKOUT сессия создается сразу неблокирующим клиентом
+    Stripe, иначе задача ставится в очередь Celery.
+    """
+
+    if not settings.STRIPE_ASYNC_CHECKOUT:
+        try:
+            await sync_to_async(create_checkout_session.delay)(
+                payment._meta.label, payment.pk
+            )
+        except Exception:
+            # Без задачи в очереди страница ждала бы ссылку бесконечно,
+            # статус failed показывает покупателю кнопку повтора
+            logger.exception("Checkout task for %s was not queued", payment)
+            payment.status = "failed"
+            await type(payment).objects.filter(pk=payment.pk, session_id="").aupdate(
+                status="failed"
+            )
+        return payment
+    try:
+        await astart_checkout(payment, paid_content)
+    except (stripe.error.StripeError, StripeUnavailable):
+        payment.status = "failed"
+        await payment.asave(update_fields=["status"])
+    return payment
+
+
+@shared_task
+def process_user_avatar(user_id):
+    """Фоновое создание миниатюр фото профиля"""
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is not None:
+        process_avatar(user)
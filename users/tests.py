@@ -1,13 +1,43 @@
+import hashlib
+import hmac
+import json
+import tempfile
+import time
+from io import BytesIO, StringIO
+import stripe
 from rest_framework.test import APITestCase
 from rest_framework import status
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.template import Context, Template
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from unittest.mock import patch
-from .models import Payment
+from django.contrib.auth.models import Group
+from unittest.mock import Mock, patch
+from PIL import Image
+from notes.models import BuyerSubscription, ContentPayment, PaidContent
+from config.timing import end_timings, start_timings
+from .fake_stripe import start_fake_stripe
+from .models import Payment, StripeCatalogEntry, StripeEvent
+from .permissions import IsModer, IsOwner
+from .roles import MODER_GROUP
+from .services import get_catalog_entry, list_checkout_sessions, start_checkout
+from .stripe_client import (
+    CIRCUIT_OPEN_KEY,
+    StripeUnavailable,
+    get_metrics,
+    is_available,
+    stripe_call,
+)
 
 User = get_user_model()
 
+WEBHOOK_SECRET = "whsec_test"
+
 
 class CustomUserTestCase(APITestCase):
     """Класс тестирования эндпоинтов модели CustomUser"""
@@ -33,20 +63,13 @@ class BuySubscriptionTests(TestCase):
 
     @patch("stripe.PaymentIntent.retrieve")
     def test_buy_subscription_success(self, mock_retrieve):
-        mock_retrieve.return_value = {"status": "succeeded"}  # Подготовка mock-ответа
-        payment = Payment.objects.create(
-            user=self.user,
-            session_id="test_session_id",
-            status="pending",
-            payment_amount=10000,
-        )
+        self.user.subscription = True
+        self.user.save()
         response = self.client.post(reverse("users:service_subscribe"))
-        self.user.refresh_from_db()
-        self.assertTrue(self.user.subscription)
-        payment.refresh_from_db()
-        self.assertEqual(payment.status, "paid")
+        mock_retrieve.assert_not_called()
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "notes/paid_content_list.html")
+        self.assertContains(response, "Подписка на услуги сервиса активна")
+        self.assertFalse(Payment.objects.exists())
 
     @patch("stripe.PaymentIntent.retrieve")
     def test_buy_subscription_payment_already_exists(self, mock_retrieve):
@@ -54,46 +77,646 @@ class BuySubscriptionTests(TestCase):
         payment = Payment.objects.create(
             user=self.user,
             session_id="test_session_id",
-            status="pending",
+            payment_link="https://checkout.stripe.test/test_session_id",
             payment_amount=10000,
         )
-        mock_retrieve.return_value = {"status": "succeeded"}
         response = self.client.post(reverse("users:service_subscribe"))
-        self.user.refresh_from_db()
-        self.assertTrue(self.user.subscription)
-        payment.refresh_from_db()
-        self.assertEqual(payment.status, "paid")
+        mock_retrieve.assert_not_called()
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "notes/paid_content_list.html")
+        self.assertEqual(response.context["payment"], payment)
+        self.assertContains(response, payment.payment_link)
+        self.assertEqual(Payment.objects.count(), 1)
 
-    @patch("stripe.PaymentIntent.retrieve")
-    def test_buy_subscription_payment_failed(self, mock_retrieve):
+    def test_buy_subscription_payment_failed(self):
         payment = Payment.objects.create(
             user=self.user,
             session_id="test_session_id",
-            status="pending",
+            status="failed",
             payment_amount=10000,
         )
-        mock_retrieve.return_value = {"status": "failed"}
+        response = self.client.get(reverse("users:service_subscribe"))
+        self.assertEqual(response.context["payment"], payment)
+        self.assertTemplateUsed(response, "users/buy_subscription.html")
         response = self.client.post(reverse("users:service_subscribe"))
-        self.assertFalse(self.user.subscription)
+        self.assertNotEqual(response.context["payment"], payment)
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_buy_subscription_creates_checkout_in_background(self):
+        response = self.client.get(reverse("users:service_subscribe"))
+        self.assertEqual(response.status_code, 200)
+        payment = Payment.objects.get(user=self.user)
+        self.assertTrue(payment.session_id.startswith("cs_fake_"))
+        self.assertTrue(payment.payment_link)
+
+    def test_buy_subscription_restarts_lost_checkout(self):
+        payment = Payment.objects.create(user=self.user, payment_amount=10000)
+        response = self.client.post(reverse("users:service_subscribe"))
+        self.assertEqual(response.context["payment"], payment)
         payment.refresh_from_db()
-        self.assertEqual(payment.status, "pending")
+        self.assertTrue(payment.session_id.startswith("cs_fake_"))
+        self.assertEqual(Payment.objects.count(), 1)
+
+    @patch("users.tasks.create_checkout_session.delay")
+    def test_buy_subscription_failed_when_queue_unavailable(self, delay):
+        delay.side_effect = ConnectionError("broker is down")
+        with self.assertLogs("users.tasks", "ERROR"):
+            response = self.client.get(reverse("users:service_subscribe"))
+        self.assertContains(response, "Не удалось создать ссылку на оплату")
+        self.assertNotContains(response, 'http-equiv="refresh"')
+        self.assertEqual(Payment.objects.get(user=self.user).status, "failed")
+
+    @patch("users.tasks.start_checkout")
+    def test_buy_subscription_failed_on_unexpected_task_error(self, start):
+        start.side_effect = ValueError("unexpected")
+        response = self.client.get(reverse("users:service_subscribe"))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "users/buy_subscription.html")
+        self.assertEqual(Payment.objects.get(user=self.user).status, "failed")
 
-    @patch("stripe.PaymentIntent.retrieve")
-    def test_buy_subscription_payment_exception(self, mock_retrieve):
-        payment = Payment.objects.create(
+
+def sign_payload(payload, secret):
+    """Подписывает тело запроса так же, как это делает Stripe"""
+    timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = User.objects.create_user(
+            username="author", password="testpass", phone_number="79990000001"
+        )
+        self.content = PaidContent.objects.create(
+            user=self.author, title="Paid", price=100
+        )
+        self.content_payment = ContentPayment.objects.create(
+            user=self.user, paid_content=self.content, session_id="cs_test_content"
+        )
+        self.payment = Payment.objects.create(
+            user=self.user, session_id="cs_test_service", payment_amount=10000
+        )
+
+    def send_event(self, event_type, session_id, event_id="evt_1", secret=None):
+        payload = json.dumps(
+            {
+                "id": event_id,
+                "object": "event",
+                "type": event_type,
+                "data": {
+                    "object": {
+                        "id": session_id,
+                        "object": "checkout.session",
+                        "payment_status": "paid",
+                    }
+                },
+            }
+        )
+        return self.client.post(
+            reverse("users:stripe_webhook"),
+            data=payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(
+                payload, WEBHOOK_SECRET if secret is None else secret
+            ),
+        )
+
+    def test_content_checkout_completed(self):
+        response = self.send_event("checkout.session.completed", "cs_test_content")
+        self.assertEqual(response.status_code, 200)
+        self.content_payment.refresh_from_db()
+        self.assertEqual(self.content_payment.status, "paid")
+        self.assertTrue(
+            BuyerSubscription.objects.filter(
+                user=self.user, content=self.content, is_active=True
+            ).exists()
+        )
+
+    def test_service_checkout_completed(self):
+        self.send_event("checkout.session.completed", "cs_test_service")
+        self.payment.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.payment.status, "paid")
+        self.assertTrue(self.user.subscription)
+
+    def test_duplicate_event_ignored(self):
+        self.send_event("checkout.session.completed", "cs_test_content")
+        BuyerSubscription.objects.all().delete()
+        response = self.send_event("checkout.session.completed", "cs_test_content")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BuyerSubscription.objects.exists())
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_checkout_expired(self):
+        self.send_event("checkout.session.expired", "cs_test_service")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "expired")
+
+    def test_rejected_without_webhook_secret(self):
+        with override_settings(STRIPE_WEBHOOK_SECRET=""), self.assertLogs(
+            "users.views", "ERROR"
+        ):
+            response = self.send_event(
+                "checkout.session.completed", "cs_test_service", secret=""
+            )
+        self.assertEqual(response.status_code, 503)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.subscription)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_invalid_signature(self):
+        response = self.send_event(
+            "checkout.session.completed", "cs_test_content", secret="whsec_wrong"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.content_payment.refresh_from_db()
+        self.assertEqual(self.content_payment.status, "unpaid")
+        self.assertFalse(StripeEvent.objects.exists())
+
+
+@override_settings(STRIPE_FAKE_MODE=False)
+@patch("stripe.checkout.Session.create")
+@patch("stripe.Price.create")
+@patch("stripe.Product.create")
+class StripeCatalogTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.content = PaidContent.objects.create(
+            user=self.user, title="Paid", price=100
+        )
+
+    def prepare_mocks(self, product_create, price_create, session_create):
+        product_create.return_value = {"id": "prod_1"}
+        price_create.side_effect = lambda **kwargs: {
+            "id": f"price_{kwargs['unit_amount']}"
+        }
+        session_create.return_value = {"id": "cs_1", "url": "https://stripe.test/cs_1"}
+
+    def checkout(self, content=None):
+        content = content or self.content
+        # Новая покупка возможна только после истечения предыдущей
+        ContentPayment.objects.filter(user=self.user, status="unpaid").update(
+            status="expired"
+        )
+        payment = ContentPayment.objects.create(
             user=self.user,
-            session_id="test_session_id",
-            status="pending",
+            paid_content=content,
+            payment_amount=content.price * 100,
+        )
+        return start_checkout(payment)
+
+    def test_price_reused_between_checkouts(
+        self, product_create, price_create, session_create
+    ):
+        self.prepare_mocks(product_create, price_create, session_create)
+        self.checkout()
+        self.checkout()
+        product_create.assert_called_once()
+        price_create.assert_called_once()
+        self.assertEqual(session_create.call_count, 2)
+        self.assertEqual(
+            session_create.call_args.kwargs["line_items"],
+            [{"price": "price_10000", "quantity": 1}],
+        )
+        keys = {
+            call.kwargs["idempotency_key"] for call in session_create.call_args_list
+        }
+        self.assertEqual(len(keys), 2)
+
+    def test_single_service_catalog_entry(self, *mocks):
+        entry = get_catalog_entry()
+        self.assertEqual(get_catalog_entry(), entry)
+        self.assertEqual(get_catalog_entry(self.content).paid_content, self.content)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StripeCatalogEntry.objects.create()
+
+    def test_price_change_creates_new_price(
+        self, product_create, price_create, session_create
+    ):
+        self.prepare_mocks(product_create, price_create, session_create)
+        self.checkout()
+        self.content.price = 200
+        self.content.save()
+        self.assertEqual(
+            StripeCatalogEntry.objects.get(paid_content=self.content).price_id, ""
+        )
+        self.checkout()
+        product_create.assert_called_once()
+        self.assertEqual(price_create.call_count, 2)
+        self.assertEqual(price_create.call_args.kwargs["product"], "prod_1")
+
+    def test_sync_stripe_catalog(self, product_create, price_create, session_create):
+        self.prepare_mocks(product_create, price_create, session_create)
+        call_command("sync_stripe_catalog", stdout=StringIO())
+        self.assertEqual(StripeCatalogEntry.objects.exclude(price_id="").count(), 2)
+        price_create.reset_mock()
+        call_command("sync_stripe_catalog", stdout=StringIO())
+        price_create.assert_not_called()
+
+
+@override_settings(STRIPE_CIRCUIT_FAILURE_THRESHOLD=3)
+class StripeClientTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_circuit_opens_after_failures(self):
+        method = Mock(side_effect=stripe.error.APIConnectionError("Stripe is down"))
+        for _ in range(3):
+            with self.assertRaises(stripe.error.APIConnectionError):
+                stripe_call(method)
+        with self.assertRaises(StripeUnavailable):
+            stripe_call(method)
+        self.assertEqual(method.call_count, 3)
+        metrics = get_metrics()
+        self.assertEqual(metrics["calls"], 3)
+        self.assertEqual(metrics["errors"], 3)
+        self.assertEqual(metrics["rejected"], 1)
+        self.assertTrue(metrics["circuit_open"])
+
+    def test_success_resets_failures(self):
+        failing = Mock(side_effect=stripe.error.APIError("Server error"))
+        for _ in range(2):
+            with self.assertRaises(stripe.error.APIError):
+                stripe_call(failing)
+        self.assertEqual(stripe_call(Mock(return_value="ok")), "ok")
+        with self.assertRaises(stripe.error.APIError):
+            stripe_call(failing)
+        self.assertTrue(is_available())
+
+    def test_stripe_time_in_server_timing(self):
+        timings, token = start_timings()
+        try:
+            stripe_call(Mock(return_value="ok"))
+        finally:
+            end_timings(token)
+        self.assertEqual(timings.as_dict()["stripe"]["count"], 1)
+
+    def test_buy_page_when_stripe_unavailable(self):
+        User.objects.create_user(username="testuser", password="testpass")
+        self.client.login(username="testuser", password="testpass")
+        cache.set(CIRCUIT_OPEN_KEY, True)
+        response = self.client.get(reverse("users:service_subscribe"))
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, "users/stripe_unavailable.html")
+        self.assertFalse(Payment.objects.exists())
+
+
+@patch("users.management.commands.reconcile_payments.time.sleep")
+@patch("users.management.commands.reconcile_payments.list_checkout_sessions")
+class ReconcilePaymentsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.content = PaidContent.objects.create(
+            user=self.user, title="Paid", price=100
+        )
+        self.buyer = User.objects.create_user(username="buyer", password="testpass")
+
+    def create_content_payment(self, session_id, content=None):
+        return ContentPayment.objects.create(
+            user=self.buyer,
+            paid_content=content
+            or PaidContent.objects.create(user=self.user, title=session_id),
             payment_amount=10000,
+            session_id=session_id,
+        )
+
+    def sessions(self, *sessions, has_more=False):
+        return {"data": list(sessions), "has_more": has_more}
+
+    def test_updates_statuses_and_grants_access(self, list_sessions, sleep):
+        paid = self.create_content_payment("cs_paid", self.content)
+        expired = self.create_content_payment("cs_expired")
+        pending = self.create_content_payment("cs_open")
+        service = Payment.objects.create(
+            user=self.buyer, payment_amount=10000, session_id="cs_service"
+        )
+        list_sessions.return_value = self.sessions(
+            {"id": "cs_paid", "payment_status": "paid", "status": "complete"},
+            {"id": "cs_expired", "payment_status": "unpaid", "status": "expired"},
+            {"id": "cs_open", "payment_status": "unpaid", "status": "open"},
+            {"id": "cs_service", "payment_status": "paid", "status": "complete"},
+        )
+        call_command("reconcile_payments", batch_size=2, stdout=StringIO())
+
+        for payment, status_ in (
+            (paid, "paid"),
+            (expired, "expired"),
+            (pending, "unpaid"),
+            (service, "paid"),
+        ):
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, status_)
+        self.assertTrue(
+            BuyerSubscription.objects.filter(
+                user=self.buyer, content=self.content, is_active=True
+            ).exists()
+        )
+        self.buyer.refresh_from_db()
+        self.assertTrue(self.buyer.subscription)
+        list_sessions.assert_called_once()
+
+    def test_retries_on_rate_limit(self, list_sessions, sleep):
+        self.create_content_payment("cs_paid")
+        list_sessions.side_effect = [
+            stripe.error.RateLimitError("Too many requests"),
+            self.sessions({"id": "cs_paid", "payment_status": "paid"}),
+        ]
+        call_command("reconcile_payments", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list_sessions.call_count, 2)
+        self.assertTrue(ContentPayment.objects.filter(status="paid").exists())
+
+    def test_resume_skips_processed_rows(self, list_sessions, sleep):
+        first = self.create_content_payment("cs_first")
+        second = self.create_content_payment("cs_second")
+        list_sessions.return_value = self.sessions(
+            {"id": "cs_first", "payment_status": "paid"},
+            {"id": "cs_second", "payment_status": "paid"},
+        )
+        cache.set("reconcile_payments:notes.contentpayment", first.pk)
+        call_command("reconcile_payments", resume=True, stdout=StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, "unpaid")
+        self.assertEqual(second.status, "paid")
+
+
+@override_settings(STRIPE_FAKE_MODE=False, STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class FakeStripeServerTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = start_fake_stripe(webhook_secret=WEBHOOK_SECRET)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.reset()
+        self.server.error_rate = 0
+        patcher = patch.multiple(
+            stripe, api_base=self.server.base_url, max_network_retries=0
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.content = PaidContent.objects.create(
+            user=self.user, title="Paid", price=100
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def checkout(self, content=None):
+        content = content or self.content
+        payment = ContentPayment.objects.create(
+            user=self.user,
+            paid_content=content,
+            payment_amount=content.price * 100,
+        )
+        return start_checkout(payment)
+
+    def test_checkout_and_signed_webhook(self):
+        payment = self.checkout()
+        self.assertTrue(payment.session_id.startswith("cs_test_"))
+        self.assertTrue(payment.payment_link.startswith(self.server.base_url))
+
+        self.server.complete_session(payment.session_id)
+        event = self.server.events[-1]
+        self.assertEqual(event["type"], "checkout.session.completed")
+        self.assertEqual(event["data"]["object"]["amount_total"], 10000)
+        payload = json.dumps(event)
+        response = self.client.post(
+            reverse("users:stripe_webhook"),
+            data=payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, WEBHOOK_SECRET),
         )
-        mock_retrieve.side_effect = Exception("Stripe error")
-        response = self.client.post(reverse("users:service_subscribe"))
-        self.assertFalse(self.user.subscription)
-        payment.refresh_from_db()
-        self.assertEqual(payment.status, "pending")
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "users/buy_subscription.html")
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "paid")
+
+    def test_checkout_retry_reuses_session(self):
+        """Повтор с тем же ключом идемпотентности не создает вторую сессию"""
+        payment = self.checkout()
+        session_id = payment.session_id
+        payment.session_id = ""
+        start_checkout(payment)
+        self.assertEqual(payment.session_id, session_id)
+        self.assertEqual(len(self.server.sessions), 1)
+
+    def test_checkout_keeps_session_saved_by_other_worker(self):
+        payment = ContentPayment.objects.create(
+            user=self.user, paid_content=self.content, payment_amount=10000
+        )
+        # Пока шел запрос к Stripe, сессию сохранил другой исполнитель
+        ContentPayment.objects.filter(pk=payment.pk).update(
+            session_id="cs_other", payment_link="https://checkout.stripe.test/other"
+        )
+        start_checkout(payment)
+        self.assertEqual(payment.session_id, "cs_other")
+        payment.refresh_from_db()
+        self.assertEqual(payment.session_id, "cs_other")
+
+    def test_list_sessions(self):
+        first = self.checkout()
+        second = self.checkout(
+            PaidContent.objects.create(user=self.user, title="Second", price=100)
+        )
+        page = list_checkout_sessions(0, limit=1)
+        self.assertEqual([s["id"] for s in page["data"]], [second.session_id])
+        self.assertTrue(page["has_more"])
+        page = list_checkout_sessions(0, starting_after=second.session_id)
+        self.assertEqual([s["id"] for s in page["data"]], [first.session_id])
+        self.assertFalse(page["has_more"])
+
+    def test_simulated_errors(self):
+        self.server.error_rate = 1
+        with self.assertRaises((stripe.error.APIError, stripe.error.RateLimitError)):
+            self.checkout()
+
+
+@override_settings(DEBUG=True)
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass", is_staff=True
+        )
+        self.client.login(username="testuser", password="testpass")
+
+    def test_views_within_budget(self):
+        for name in ("user_profile", "service_subscribe", "stripe_metrics"):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(f"users:{name}"))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    int(response["X-DB-Queries"]), int(response["X-DB-Query-Budget"])
+                )
+
+    def test_eager_task_queries_not_counted(self):
+        response = self.client.get(reverse("users:service_subscribe"))
+        # Сессию создала задача, ее запросы в счетчик представления не попали
+        self.assertTrue(Payment.objects.get(user=self.user).session_id)
+        self.assertEqual(int(response["X-DB-Queries"]), 7)
+
+
+class RoleCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="moder", password="testpass")
+        self.group = Group.objects.create(name=MODER_GROUP)
+        self.request = Mock(user=self.user)
+
+    def fresh_request(self):
+        return Mock(user=User.objects.get(pk=self.user.pk))
+
+    def test_warm_check_without_queries(self):
+        self.user.groups.add(self.group)
+        self.assertTrue(IsModer().has_permission(self.fresh_request(), None))
+        request = self.fresh_request()
+        with self.assertNumQueries(0):
+            self.assertTrue(IsModer().has_permission(request, None))
+
+    def test_invalidated_on_group_changes(self):
+        permission = IsModer()
+        self.assertFalse(permission.has_permission(self.fresh_request(), None))
+        self.user.groups.add(self.group)
+        self.assertTrue(permission.has_permission(self.fresh_request(), None))
+        self.group.user_set.remove(self.user)
+        self.assertFalse(permission.has_permission(self.fresh_request(), None))
+        self.group.user_set.add(self.user)
+        self.assertTrue(permission.has_permission(self.fresh_request(), None))
+        self.group.user_set.clear()
+        self.assertFalse(permission.has_permission(self.fresh_request(), None))
+
+    def test_is_owner_compares_ids(self):
+        content = PaidContent.objects.create(user=self.user, title="Paid", price=10)
+        content = PaidContent.objects.only("id", "user_id").get(pk=content.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                IsOwner().has_object_permission(self.request, None, content)
+            )
+            self.assertFalse(
+                IsOwner().has_object_permission(Mock(user=Mock(pk=0)), None, content)
+            )
+
+
+class AvatarTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_patch = override_settings(MEDIA_ROOT=media.name)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+    def upload(self, name="photo.png", size=(800, 600), color="red"):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        Image.new("RGB", size, color).save(buffer, "PNG", exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def test_upload_creates_variants_without_metadata(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                username="testuser", password="testpass", avatar=self.upload()
+            )
+        user.refresh_from_db()
+        self.assertEqual(user.avatar.name, "users/avatars/photo.jpg")
+        self.assertEqual(user.avatar_variants["source"], user.avatar.name)
+        self.assertEqual(set(user.avatar_variants["sizes"]), {"64", "150", "300"})
+        with default_storage.open(user.avatar_variants["sizes"]["150"]["webp"]) as file:
+            with Image.open(file) as image:
+                self.assertEqual((image.format, image.size), ("WEBP", (150, 150)))
+        with default_storage.open(user.avatar.name) as file:
+            with Image.open(file) as image:
+                self.assertEqual(image.size, (800, 600))
+                self.assertFalse(image.getexif())
+
+        # Повторное сохранение без смены фото не запускает обработку
+        with patch("users.signals.process_user_avatar.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.save()
+        delay.assert_not_called()
+
+    def test_same_file_names_of_different_users_do_not_collide(self):
+        users = []
+        for username, name, color in (
+            ("first", "me.jpg", "red"),
+            ("second", "me.png", "blue"),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                user = User.objects.create_user(
+                    username=username,
+                    password="testpass",
+                    phone_number=f"7999{len(users)}",
+                    avatar=self.upload(name, color=color),
+                )
+            user.refresh_from_db()
+            users.append(user)
+        first, second = users
+        self.assertNotEqual(first.avatar.name, second.avatar.name)
+        for user, color in ((first, (254, 0, 0)), (second, (0, 0, 254))):
+            with default_storage.open(user.avatar.name) as file:
+                with Image.open(file) as image:
+                    pixel = image.getpixel((0, 0))
+            for channel, expected in zip(pixel, color):
+                self.assertAlmostEqual(channel, expected, delta=3)
+
+    def test_force_reprocessing_removes_old_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                username="testuser", password="testpass", avatar=self.upload()
+            )
+        user.refresh_from_db()
+        old = user.avatar_variants
+        call_command("process_avatars", force=True, stdout=StringIO())
+        user.refresh_from_db()
+        self.assertNotEqual(user.avatar_variants["source"], old["source"])
+        self.assertTrue(default_storage.exists(user.avatar.name))
+        self.assertFalse(default_storage.exists(old["source"]))
+        for size, formats in old["sizes"].items():
+            for format, path in formats.items():
+                self.assertFalse(default_storage.exists(path))
+                self.assertTrue(
+                    default_storage.exists(user.avatar_variants["sizes"][size][format])
+                )
+
+    def test_avatar_tag_selects_variant_by_size(self):
+        user = User.objects.create_user(username="testuser", password="testpass")
+        user.avatar = "users/avatars/photo.jpg"
+        user.avatar_variants = {
+            "source": user.avatar.name,
+            "sizes": {
+                str(size): {
+                    "webp": f"v/photo-{size}.webp",
+                    "jpeg": f"v/photo-{size}.jpg",
+                }
+                for size in (64, 150, 300)
+            },
+        }
+        html = Template("{% load my_tags %}{% avatar user 100 %}").render(
+            Context({"user": user})
+        )
+        self.assertIn(
+            'srcset="/media/v/photo-150.webp 1x, /media/v/photo-300.webp 2x"', html
+        )
+        self.assertIn('src="/media/v/photo-150.jpg"', html)
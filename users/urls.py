@@ -7,6 +7,8 @@ from users.views import (
     CustomLogoutView,
     CustomLoginView,
     buy_subscription,
+    stripe_webhook,
+    stripe_metrics,
 )
 
 app_name = UsersConfig.name
@@ -29,6 +31,16 @@ urlpatterns = [
         buy_subscription,
         name="service_subscribe",
     ),
+    path(
+        "users/stripe/webhook/",
+        stripe_webhook,
+        name="stripe_webhook",
+    ),
+    path(
+        "users/stripe/metrics/",
+        stripe_metrics,
+        name="stripe_metrics",
+    ),
     path(
         "users/profile/",
         profile,
@@ -1,18 +1,26 @@
-import os
+import logging
 import stripe
+from django.conf import settings
 from django.contrib.auth import login, authenticate
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, LogoutView
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
 from django.urls import reverse_lazy
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.views.generic import CreateView
 from .forms import CustomUserCreationForm
 from rest_framework.permissions import AllowAny
 from .models import Payment
-from .services import create_stripe_price, create_stripe_session
+from . import stripe_client
+from .services import service_subscription_amount
+from .tasks import arequest_checkout
+from .webhooks import handle_stripe_event
+from config.queries import query_budget
 
-
-stripe.api_key = os.environ["STRIPE_API_KEY"]
+logger = logging.getLogger(__name__)
 
 
 class UserCreateView(CreateView):
@@ -22,6 +30,7 @@ class UserCreateView(CreateView):
     template_name = "users/register.html"
     form_class = CustomUserCreationForm
     success_url = reverse_lazy("notes:free_content_list")
+    query_budget = 6
 
     def form_valid(self, form):
         to_return = super().form_valid(form)
@@ -36,6 +45,7 @@ class UserCreateView(CreateView):
         return super().form_invalid(form)
 
 
+@query_budget(2)
 @login_required
 def profile(request):
     return render(request, "users/user_detail.html")
@@ -44,6 +54,7 @@ def profile(request):
 class CustomLoginView(LoginView):
     template_name = "users/login.html"
     success_url = reverse_lazy("notes:free_content_list")
+    query_budget = 6
 
 
 class CustomLogoutView(LogoutView):
@@ -51,45 +62,70 @@ class CustomLogoutView(LogoutView):
     success_url = reverse_lazy("notes:free_content_list")
 
 
-def create_payment(request):
-    payment_amount = create_stripe_price(
-        int(os.environ["SERVICE_SUBSCRIPTION_PRICE"]) * 100
-    )
-    payment_session = create_stripe_session(payment_amount)
-    session_id = payment_session.get("id")
-    payment_link = payment_session.get("url")
-    payment = Payment.objects.create(
+async def create_payment(request):
+    """Создает неоплаченный счет и запускает создание сессии Stripe.
+
+    Повторный или параллельный запрос получает уже созданный счет
+    благодаря уникальному ограничению на неоплаченные счета.
+    """
+    payment, created = await Payment.objects.aget_or_create(
         user=request.user,
-        payment_amount=payment_amount["unit_amount"],
-        payment_link=payment_link,
-        session_id=session_id,
+        status="unpaid",
+        defaults={"payment_amount": service_subscription_amount()},
     )
-    payment.save()
-    return payment
+    if not created:
+        return payment
+    return await arequest_checkout(payment)
 
 
+@query_budget(8)
 @login_required
-def buy_subscription(request):
-    payment_exists = Payment.objects.filter(user=request.user).exists()
-    if payment_exists:
-        payment = Payment.objects.get(user=request.user)
-        try:
-            response = stripe.PaymentIntent.retrieve(payment.session_id)
-            if response["status"] == "succeeded":
-                request.user.subscription = True
-                request.user.save()
-                payment.status = "paid"
-                payment.save()
-                return render(request, "notes/paid_content_list.html")
-            else:
-                return render(
-                    request, "users/buy_subscription.html", {"payment": payment}
-                )
-        except Exception as ex:
-            context = {"payment": payment}
-            print(ex)
-            return render(request, "users/buy_subscription.html", context)
-    else:
-        payment = create_payment(request)
-        context = {"payment": payment}
-        return render(request, "users/buy_subscription.html", context)
+async def buy_subscription(request):
+    """Покупка подписки на сервис. Статус оплаты обновляет вебхук Stripe"""
+    request.user = await request.auser()
+    payment = None
+    if not request.user.subscription:
+        payment = (
+            await Payment.objects.filter(user=request.user)
+            .order_by("-created_at")
+            .afirst()
+        )
+        if payment is None or (
+            request.method == "POST" and payment.status in ("failed", "expired")
+        ):
+            if not await stripe_client.ais_available():
+                return render(request, "users/stripe_unavailable.html", status=503)
+            payment = await create_payment(request)
+        elif request.method == "POST" and not payment.session_id:
+            # Задача создания сессии могла не попасть в очередь или упасть,
+            # повторная отправка формы запускает ее снова
+            payment = await arequest_checkout(payment)
+    return render(request, "users/buy_subscription.html", {"payment": payment})
+
+
+@query_budget(15)
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Прием событий Stripe, подпись проверяется секретом вебхука"""
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        # С пустым ключом подпись может вычислить кто угодно
+        logger.error("Stripe webhook rejected: STRIPE_WEBHOOK_SECRET is not set")
+        return HttpResponse(status=503)
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body,
+            request.headers.get("Stripe-Signature", ""),
+            settings.STRIPE_WEBHOOK_SECRET,
+        )
+    except (ValueError, stripe.error.SignatureVerificationError):
+        return HttpResponseBadRequest()
+    handle_stripe_event(event)
+    return HttpResponse()
+
+
+@query_budget(2)
+@staff_member_required
+def stripe_metrics(request):
+    """Счетчики обращений к Stripe и состояние автомата защиты"""
+    return JsonResponse(stripe_client.get_metrics())
@@ -0,0 +1,61 @@
+from django.db import transaction
+
+from notes.models import BuyerSubscription, ContentPayment
+from .models import CustomUser, Payment, StripeEvent
+
+PAID_EVENTS = (
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+)
+FAILED_EVENTS = {
+    "checkout.session.async_payment_failed": "failed",
+    "checkout.session.expired": "expired",
+}
+
+
+def handle_stripe_event(event):
+    """Обрабатывает событие Stripe один раз, повторы с тем же id пропускаются"""
+
+    with transaction.atomic():
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event["id"], defaults={"type": event["type"]}
+        )
+        if not created:
+            return False
+        session = event["data"]["object"]
+        if event["type"] in PAID_EVENTS:
+            # Для отложенных способов оплаты completed приходит до списания
+            if session.get("payment_status") in ("paid", "no_payment_required"):
+                mark_session_paid(session["id"])
+        elif event["type"] in FAILED_EVENTS:
+            mark_session_status(session["id"], FAILED_EVENTS[event["type"]])
+    return True
+
+
+def mark_session_paid(session_id):
+    """Отмечает оплату сессии и выдает доступ к контенту или сервису"""
+
+    for payment in ContentPayment.objects.filter(session_id=session_id).exclude(
+        status="paid"
+    ):
+        payment.status = "paid"
+        payment.save(update_fields=["status"])
+        BuyerSubscription.objects.update_or_create(
+            user_id=payment.user_id,
+            content_id=payment.paid_content_id,
+            defaults={"is_active": True},
+        )
+
+    for payment in Payment.objects.filter(session_id=session_id).exclude(status="paid"):
+        payment.status = "paid"
+        payment.save(update_fields=["status"])
+        CustomUser.objects.filter(pk=payment.user_id).update(subscription=True)
+
+
+def mark_session_status(session_id, status):
+    ContentPayment.objects.filter(session_id=session_id).exclude(status="paid").update(
+        status=status
+    )
+    Payment.objects.filter(session_id=session_id).exclude(status="paid").update(
+        status=status
+    )